@@ -10,10 +10,10 @@ __version__ = "1.0.0"
 __author__ = "LawBrief AI Team"
 
 from .utils import load_pdf, load_docx, clean_text, chunk_text, save_json, load_json, setup_logging
-from .clause_extractor import extract_clauses, classify_clause, extract_entities
+from .clause_extractor import extract_clauses, extract_clauses_many, classify_clause, extract_entities
 from .risk_detector import assess_risks
 from .summarizer import summarize_document
-from .report_generator import generate_pdf_report, generate_docx_report
+from .report_generator import generate_pdf_report, generate_docx_report, generate_reports
 
 __all__ = [
     "load_pdf",
@@ -24,10 +24,12 @@ __all__ = [
     "load_json",
     "setup_logging",
     "extract_clauses",
+    "extract_clauses_many",
     "classify_clause", 
     "extract_entities",
     "assess_risks",
     "summarize_document",
     "generate_pdf_report",
-    "generate_docx_report"
+    "generate_docx_report",
+    "generate_reports"
 ]
@@ -3,17 +3,23 @@
 Improved Contract Clause Extraction & Classification
 """
 
+import hashlib
 import logging
+import os
 import re
 from functools import lru_cache
-from typing import Dict, List, Optional, Tuple
+from typing import Dict, Iterator, List, Optional, Tuple
 
+import ahocorasick
 import spacy
-from sentence_transformers import SentenceTransformer
-from sklearn.metrics.pairwise import cosine_similarity
+import torch
 import numpy as np
 from itertools import groupby
 
+from .embedding_backend import MODELS_DIR, encoder_backend, get_sentence_encoder, resolve_model_name
+from .embedding_cache import EmbeddingCache
+from .vector_ops import cos_sim_matrix
+
 logging.basicConfig(level=logging.INFO)
 
 # Load spaCy model
@@ -23,9 +29,20 @@ except OSError:
     logging.error("spaCy model not found. Install: python -m spacy download en_core_web_trf")
     raise
 
-# Load better transformer
+# Entity extraction only reads doc.ents, so skip tagger/parser/lemmatizer there
+NER_DISABLED_PIPES = [p for p in nlp.pipe_names if p not in ("transformer", "ner")]
+
+# Rule-based sentence splitter for the clause fallback (no transformer pass)
+sent_nlp = spacy.blank("en")
+sent_nlp.add_pipe("sentencizer")
+
+SENTENCE_MODEL_NAME = resolve_model_name("all-mpnet-base-v2")
+
+# Load better transformer (fp16 on GPU when available)
+# or the int8 ONNX export on CPU when it has been generated
+device = "cuda" if torch.cuda.is_available() else "cpu"
 try:
-    sentence_model = SentenceTransformer("all-mpnet-base-v2")
+    sentence_model = get_sentence_encoder(SENTENCE_MODEL_NAME, device=device)
 except Exception as e:
     logging.error(f"Failed to load transformer: {e}")
     raise
@@ -57,9 +74,120 @@ TEMPLATE_CLAUSES = {
     "renewal": "This agreement shall automatically renew for successive one-year terms."
 }
 
+TEMPLATE_TYPES = list(TEMPLATE_CLAUSES.keys())
+KEYWORD_TYPES = list(CLAUSE_KEYWORDS.keys())
+
+def _build_keyword_automaton() -> ahocorasick.Automaton:
+    """
+    Build one automaton over every clause keyword. Each keyword maps to the
+    (type_index, weight) pairs it contributes, so a single scan of the text
+    reproduces the per-type `count(k) / len(keywords)` scores.
+    """
+    contributions: Dict[str, List[Tuple[int, float]]] = {}
+    for type_idx, clause_type in enumerate(KEYWORD_TYPES):
+        keywords = CLAUSE_KEYWORDS[clause_type]
+        for keyword in keywords:
+            contributions.setdefault(keyword, []).append((type_idx, 1.0 / len(keywords)))
+
+    automaton = ahocorasick.Automaton()
+    for keyword, values in contributions.items():
+        automaton.add_word(keyword, values)
+    automaton.make_automaton()
+    return automaton
+
+_KEYWORD_AUTOMATON = _build_keyword_automaton()
+
+# Precompiled patterns
+_HEADING_RE = re.compile(r"(?m)^(?:\d+(?:\.\d+)*\.|[A-Z][A-Z\s]+):?\s")
+_FIRST_LINES_RE = re.compile(r"\A([^\n]*)(?:\n([^\n]*))?")
+_FIRST_SENT_RE = re.compile(r"[^.!?]*")
+
+def _template_embeddings_path() -> str:
+    """
+    On-disk location of the template matrix, under models/. The file name
+    carries a digest of the model name, encoder backend (ONNX, int8, fp32...)
+    and template texts, so changing any of them invalidates it.
+    """
+    fingerprint = "\n".join(
+        [SENTENCE_MODEL_NAME, encoder_backend(sentence_model)]
+        + [f"{t}={TEMPLATE_CLAUSES[t]}" for t in TEMPLATE_TYPES]
+    )
+    digest = hashlib.sha1(fingerprint.encode("utf-8")).hexdigest()[:12]
+    return os.path.join(MODELS_DIR, f"template_embeddings_{digest}.npy")
+
 @lru_cache(maxsize=1)
-def _get_template_embeddings() -> Dict[str, np.ndarray]:
-    return {k: sentence_model.encode([v])[0] for k, v in TEMPLATE_CLAUSES.items()}
+def _get_template_embeddings() -> np.ndarray:
+    """
+    Stacked (n_types, d) float32 template matrix, rows ordered as
+    TEMPLATE_TYPES. Loaded from disk when available; otherwise (or if the
+    file is unreadable) encoded once and persisted so later processes skip
+    the forward passes.
+    """
+    path = _template_embeddings_path()
+    if os.path.exists(path):
+        try:
+            return np.asarray(np.load(path), dtype=np.float32)
+        except (OSError, ValueError, EOFError) as e:
+            logging.warning(f"Unreadable template embeddings at {path}, re-encoding: {e}")
+
+    embeddings = np.asarray(
+        sentence_model.encode(
+            [TEMPLATE_CLAUSES[t] for t in TEMPLATE_TYPES],
+            convert_to_numpy=True,
+            normalize_embeddings=True,
+            show_progress_bar=False
+        ),
+        dtype=np.float32
+    )
+    # Written to a temp file and renamed into place, so a process killed
+    # mid-write never leaves a truncated file at `path`
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        os.makedirs(MODELS_DIR, exist_ok=True)
+        with open(tmp_path, "wb") as f:
+            np.save(f, embeddings)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        logging.warning(f"Could not persist template embeddings to {path}: {e}")
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+    return embeddings
+
+# Boilerplate clauses repeat across contracts; reuse their embeddings
+_clause_embedding_cache = EmbeddingCache(
+    sentence_model, maxsize=10000, batch_size=1024, normalize_embeddings=True
+)
+
+def _encode_clauses(texts: List[str]) -> np.ndarray:
+    """Encode all clause texts in a single batched forward pass (cache misses only)."""
+    with torch.inference_mode():
+        return _clause_embedding_cache.encode(texts)
+
+def get_clause_embeddings(clauses: List[Dict]) -> np.ndarray:
+    """
+    Normalized (len(clauses), d) embeddings of extracted clauses, from
+    SENTENCE_MODEL_NAME. Clauses just returned by `extract_clauses` are
+    served from the embedding cache without another forward pass.
+    """
+    return _encode_clauses([clause["text"] for clause in clauses])
+
+def _iter_heading_chunks(text: str, min_length: int = 40) -> Iterator[str]:
+    """
+    Yield the stripped text between heading matches, skipping short chunks.
+    Equivalent to filtering `_HEADING_RE.split(text)` without building the
+    intermediate list of every part.
+    """
+    prev = 0
+    for match in _HEADING_RE.finditer(text):
+        chunk = text[prev:match.start()].strip()
+        prev = match.end()
+        if len(chunk) > min_length:
+            yield chunk
+    tail = text[prev:].strip()
+    if len(tail) > min_length:
+        yield tail
 
 def _split_into_clauses(text: str) -> List[str]:
     """
@@ -69,54 +197,57 @@ def _split_into_clauses(text: str) -> List[str]:
     - Semantic chunking
     """
     # First, try heading-based
-    # heading_pattern = r"(?m)^(?:\d+(\.\d+)*\.|[A-Z][A-Z\s]+):?\s"
-
-    heading_pattern = r"(?m)^(?:\d+(?:\.\d+)*\.|[A-Z][A-Z\s]+):?\s"
-    parts = re.split(heading_pattern, text)
-    clauses = []
-
-    for part in parts:
-        chunk = part.strip()
-        if len(chunk) > 40:  # min length filter
-            clauses.append(chunk)
+    clauses = list(_iter_heading_chunks(text))
 
     if not clauses:
         # Fallback: sentence grouping
-        doc = nlp(text)
+        doc = sent_nlp(text)
         buffer = []
+        buffer_len = 0
         for sent in doc.sents:
             buffer.append(sent.text)
-            if sum(len(s) for s in buffer) > 250:
+            buffer_len += len(sent.text)
+            if buffer_len > 250:
                 clauses.append(" ".join(buffer).strip())
                 buffer = []
+                buffer_len = 0
         if buffer:
             clauses.append(" ".join(buffer).strip())
 
     return clauses
 
-def classify_clause(text: str) -> Tuple[str, float]:
+def classify_clause(text: str, embedding: Optional[np.ndarray] = None) -> Tuple[str, float]:
     """
     Classify clause using weighted keyword + semantic similarity.
+    Pass a precomputed `embedding` to skip encoding the clause again.
     Returns (clause_type, confidence_score)
     """
+    if embedding is None:
+        embedding = _encode_clauses([text])[0]
+    similarities = cos_sim_matrix(embedding, _get_template_embeddings())[0]
+    return _classify_with_similarities(text, similarities)
+
+def _classify_with_similarities(text: str, similarities: np.ndarray) -> Tuple[str, float]:
+    """
+    Combine keyword scores with precomputed template similarities
+    (one entry per TEMPLATE_TYPES row).
+    """
     text_lower = text.lower()
 
-    # Keyword score
-    keyword_scores = {}
-    for clause_type, keywords in CLAUSE_KEYWORDS.items():
-        score = sum(text_lower.count(k) for k in keywords) / len(keywords)
-        keyword_scores[clause_type] = score
+    # Keyword score (single multi-pattern pass over the text)
+    keyword_scores = np.zeros(len(KEYWORD_TYPES))
+    for _, values in _KEYWORD_AUTOMATON.iter(text_lower):
+        for type_idx, weight in values:
+            keyword_scores[type_idx] += weight
 
-    best_kw = max(keyword_scores, key=keyword_scores.get)
-    kw_score = keyword_scores[best_kw]
+    kw_idx = int(np.argmax(keyword_scores))
+    best_kw = KEYWORD_TYPES[kw_idx]
+    kw_score = keyword_scores[kw_idx]
 
     # Semantic score
-    clause_embedding = sentence_model.encode([text])
-    template_embeddings = _get_template_embeddings()
-    similarities = {ct: cosine_similarity(clause_embedding, [emb])[0][0]
-                    for ct, emb in template_embeddings.items()}
-    best_sem = max(similarities, key=similarities.get)
-    sem_score = similarities[best_sem]
+    best_idx = int(np.argmax(similarities))
+    best_sem = TEMPLATE_TYPES[best_idx]
+    sem_score = similarities[best_idx]
 
     # Combine scores (weighted)
     if kw_score > 0.3 and sem_score > 0.65:
@@ -129,16 +260,19 @@ def classify_clause(text: str) -> Tuple[str, float]:
     confidence = max(kw_score, sem_score)
     return final_type.replace("_", " ").title(), round(float(confidence), 3)
 
+ENTITY_LABELS = {"ORG", "PERSON", "DATE", "MONEY", "GPE", "TIME", "PERCENT", "QUANTITY", "LAW"}
+
 def extract_entities(text: str) -> List[Dict]:
     """
     Extract named entities with extended legal coverage.
     """
-    doc = nlp(text)
-    entities = []
-    allowed_labels = {"ORG", "PERSON", "DATE", "MONEY", "GPE", "TIME", "PERCENT", "QUANTITY", "LAW"}
+    return _entities_from_doc(nlp(text, disable=NER_DISABLED_PIPES))
 
+def _entities_from_doc(doc) -> List[Dict]:
+    """Collect allowed entities from an already-processed spaCy Doc."""
+    entities = []
     for ent in doc.ents:
-        if ent.label_ in allowed_labels:
+        if ent.label_ in ENTITY_LABELS:
             entities.append({
                 "text": ent.text,
                 "label": ent.label_,
@@ -147,31 +281,74 @@ def extract_entities(text: str) -> List[Dict]:
             })
     return entities
 
-def extract_clauses(text: str) -> List[Dict]:
-    raw_clauses = _split_into_clauses(text)
-    results = []
-    for i, clause_text in enumerate(raw_clauses, start=1):
-        ctype, confidence = classify_clause(clause_text)
-        entities = extract_entities(clause_text)
-        results.append({
-            "id": i,
+def extract_clauses(text: str, n_process: int = 1, batch_size: int = 64) -> List[Dict]:
+    """
+    Extract clauses from one document. NER over its clauses is batched
+    through `nlp.pipe`; see `extract_clauses_many` for `n_process`.
+    """
+    return extract_clauses_many([text], n_process=n_process, batch_size=batch_size)[0]
+
+def extract_clauses_many(
+    texts: List[str],
+    n_process: Optional[int] = None,
+    batch_size: int = 64
+) -> List[List[Dict]]:
+    """
+    Extract clauses from several documents at once.
+
+    All clauses across all documents are encoded in one batch and streamed
+    through `nlp.pipe` with `n_process` workers (default: cpu_count - 1).
+    Multi-process NER spawns workers, so scripts using n_process > 1 must
+    guard their entry point with `if __name__ == "__main__":`.
+    Returns one clause list per input text, ids restarting at 1 per document.
+    """
+    if n_process is None:
+        n_process = max(1, (os.cpu_count() or 1) - 1)
+
+    per_doc_clauses = [_split_into_clauses(text) for text in texts]
+    all_clauses = [clause for clauses in per_doc_clauses for clause in clauses]
+    results: List[List[Dict]] = [[] for _ in texts]
+    if not all_clauses:
+        return results
+
+    embeddings = _encode_clauses(all_clauses)
+    # Score every clause against every template in one call
+    similarity_matrix = cos_sim_matrix(embeddings, _get_template_embeddings())
+    # Batch NER through the pipeline instead of one nlp() call per clause
+    docs = nlp.pipe(
+        all_clauses,
+        batch_size=batch_size,
+        n_process=n_process,
+        disable=NER_DISABLED_PIPES
+    )
+
+    # Map each flat clause index back to (document index, clause id)
+    owners = [
+        (doc_idx, clause_id)
+        for doc_idx, clauses in enumerate(per_doc_clauses)
+        for clause_id in range(1, len(clauses) + 1)
+    ]
+    for (doc_idx, clause_id), clause_text, similarities, doc in zip(
+        owners, all_clauses, similarity_matrix, docs
+    ):
+        ctype, confidence = _classify_with_similarities(clause_text, similarities)
+        results[doc_idx].append({
+            "id": clause_id,
             "title": _extract_title_from_text(clause_text),
             "text": clause_text,
             "type": ctype,
             "confidence": confidence,
-            "entities": entities
+            "entities": _entities_from_doc(doc)
         })
     return results
 
 def _extract_title_from_text(text: str) -> Optional[str]:
-    # Headings first
-    lines = text.split("\n")
-    for line in lines[:2]:
+    # Headings first (only the first two lines are scanned, not the whole clause)
+    for line in _FIRST_LINES_RE.match(text).groups(default=""):
         if len(line) > 5 and (line.isupper() or ":" in line):
             return line.replace(":", "").strip()
     # Else first sentence
-    sentences = re.split(r"[.!?]+", text)
-    return sentences[0].strip() if sentences else None
+    return _FIRST_SENT_RE.match(text).group().strip()
 
 if __name__ == "__main__":
     sample = """
@@ -0,0 +1,273 @@
+# File: backend/embedding_backend.py
+"""
+Sentence encoder loading, with an optional int8 ONNX Runtime backend
+for CPU-only deployments.
+"""
+
+import gc
+import logging
+import os
+from functools import lru_cache
+from typing import Any, List
+
+import numpy as np
+
+MODELS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "models")
+MPNET_MODEL_NAME = "sentence-transformers/all-mpnet-base-v2"
+MPNET_INT8_PATH = os.path.join(MODELS_DIR, "mpnet-int8.onnx")
+
+# Override the clause/risk encoder, e.g. "all-MiniLM-L6-v2" or
+# "model2vec:minishlab/potion-base-8M" for a static (pure NumPy) model
+EMBED_MODEL_ENV = "LAWBRIEF_EMBED_MODEL"
+MODEL2VEC_PREFIX = "model2vec:"
+
+# Set LAWBRIEF_INT8=1 to dynamically quantize SentenceTransformer encoders on CPU
+ENCODER_INT8_ENV = "LAWBRIEF_INT8"
+
+
+def resolve_model_name(default: str) -> str:
+    """Return the encoder name from LAWBRIEF_EMBED_MODEL, or `default`."""
+    return os.getenv(EMBED_MODEL_ENV, default)
+
+
+class OnnxSentenceEncoder:
+    """
+    Minimal drop-in for `SentenceTransformer.encode` backed by a quantized
+    ONNX export: tokenize, run the session, mean-pool with the attention mask.
+    """
+
+    lawbrief_backend = "onnx-int8"
+
+    def __init__(self, model_path: str, tokenizer_name: str, max_seq_length: int = 384) -> None:
+        import onnxruntime as ort
+        from transformers import AutoTokenizer
+
+        sess_options = ort.SessionOptions()
+        sess_options.intra_op_num_threads = os.cpu_count() or 1
+        self.session = ort.InferenceSession(
+            model_path, sess_options, providers=["CPUExecutionProvider"]
+        )
+        self.input_names = {i.name for i in self.session.get_inputs()}
+        self.tokenizer = AutoTokenizer.from_pretrained(tokenizer_name)
+        self.max_seq_length = max_seq_length
+
+    def encode(
+        self,
+        sentences: List[str],
+        batch_size: int = 32,
+        normalize_embeddings: bool = False,
+        **kwargs: Any
+    ) -> np.ndarray:
+        """
+        Return a (len(sentences), d) float32 embedding matrix.
+
+        Sentences are encoded in length-sorted batches so each batch pads to
+        a similar length, then returned in their original order.
+        """
+        if isinstance(sentences, str):
+            sentences = [sentences]
+
+        order = np.argsort([len(s) for s in sentences], kind="stable")
+        sorted_sentences = [sentences[i] for i in order]
+
+        batches = []
+        for start in range(0, len(sorted_sentences), batch_size):
+            encoded = self.tokenizer(
+                sorted_sentences[start:start + batch_size],
+                padding=True,
+                truncation=True,
+                max_length=self.max_seq_length,
+                return_tensors="np"
+            )
+            feeds = {k: v.astype(np.int64) for k, v in encoded.items() if k in self.input_names}
+            token_embeddings = self.session.run(None, feeds)[0]
+
+            mask = encoded["attention_mask"][..., None].astype(np.float32)
+            pooled = (token_embeddings * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+            batches.append(pooled.astype(np.float32))
+
+        if not batches:
+            return np.zeros((0, 0), dtype=np.float32)
+
+        # Undo the length sort
+        sorted_embeddings = np.concatenate(batches)
+        embeddings = np.empty_like(sorted_embeddings)
+        embeddings[order] = sorted_embeddings
+        if normalize_embeddings:
+            embeddings /= np.clip(np.linalg.norm(embeddings, axis=1, keepdims=True), 1e-12, None)
+        return embeddings
+
+
+class StaticSentenceEncoder:
+    """
+    `SentenceTransformer.encode`-compatible wrapper around a model2vec
+    static embedding model (token lookups + pooling, no transformer pass).
+    """
+
+    lawbrief_backend = "model2vec"
+
+    def __init__(self, model_name: str) -> None:
+        from model2vec import StaticModel
+
+        self.model = StaticModel.from_pretrained(model_name)
+
+    def encode(
+        self,
+        sentences: List[str],
+        batch_size: int = 1024,
+        normalize_embeddings: bool = False,
+        **kwargs: Any
+    ) -> np.ndarray:
+        """Return a (len(sentences), d) float32 embedding matrix."""
+        if isinstance(sentences, str):
+            sentences = [sentences]
+        embeddings = np.asarray(
+            self.model.encode(sentences, batch_size=batch_size), dtype=np.float32
+        )
+        if normalize_embeddings and len(embeddings):
+            embeddings /= np.clip(np.linalg.norm(embeddings, axis=1, keepdims=True), 1e-12, None)
+        return embeddings
+
+
+def export_quantized_model(
+    model_name: str = MPNET_MODEL_NAME,
+    output_path: str = MPNET_INT8_PATH
+) -> str:
+    """
+    Export a Hugging Face encoder to ONNX and apply dynamic int8 quantization.
+    Run once offline; `load_sentence_encoder` picks the file up afterwards.
+    """
+    import torch
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+    from transformers import AutoModel, AutoTokenizer
+
+    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    fp32_path = output_path.replace(".onnx", "-fp32.onnx")
+
+    tokenizer = AutoTokenizer.from_pretrained(model_name)
+    model = AutoModel.from_pretrained(model_name).eval()
+    dummy = tokenizer(["LawBrief AI export"], return_tensors="pt")
+
+    torch.onnx.export(
+        model,
+        (dummy["input_ids"], dummy["attention_mask"]),
+        fp32_path,
+        input_names=["input_ids", "attention_mask"],
+        output_names=["last_hidden_state"],
+        dynamic_axes={
+            "input_ids": {0: "batch", 1: "sequence"},
+            "attention_mask": {0: "batch", 1: "sequence"},
+            "last_hidden_state": {0: "batch", 1: "sequence"}
+        },
+        opset_version=14
+    )
+    quantize_dynamic(fp32_path, output_path, weight_type=QuantType.QInt8)
+    os.remove(fp32_path)
+
+    logging.info(f"Quantized encoder written to {output_path}")
+    return output_path
+
+
+def configure_torch_threads() -> None:
+    """
+    Use every core for intra-op parallelism and a single inter-op thread.
+    PyTorch's defaults inside a Streamlit worker leave most cores idle.
+    """
+    import torch
+
+    try:
+        torch.set_num_threads(os.cpu_count() or 1)
+        torch.set_num_interop_threads(1)
+    except RuntimeError as e:
+        # set_num_interop_threads may only be called before any parallel work
+        logging.debug(f"Torch thread settings left unchanged: {e}")
+
+
+def _quantize_sentence_transformer(model):
+    """
+    Dynamically quantize the Linear layers of a SentenceTransformer's
+    transformer module to int8 (weights int8, activations quantized on the fly).
+    """
+    import torch
+
+    transformer = model[0]
+    if not hasattr(transformer, "auto_model"):
+        logging.warning("Encoder has no transformer module to quantize; keeping fp32")
+        return model
+    transformer.auto_model = torch.quantization.quantize_dynamic(
+        transformer.auto_model, {torch.nn.Linear}, dtype=torch.qint8
+    )
+    model.lawbrief_backend = "torch-int8"
+    return model
+
+
+def load_sentence_encoder(model_name: str, device: str = "cpu"):
+    """
+    Load the sentence encoder for `model_name`.
+
+    Names prefixed with "model2vec:" load a static model2vec encoder. On CPU,
+    the int8 ONNX export of all-mpnet-base-v2 is used when it has been
+    generated with `export_quantized_model`; otherwise this falls back to a
+    regular SentenceTransformer (cast to fp16 on CUDA, or dynamically
+    quantized to int8 on CPU when LAWBRIEF_INT8=1).
+    """
+    if model_name.startswith(MODEL2VEC_PREFIX):
+        return StaticSentenceEncoder(model_name[len(MODEL2VEC_PREFIX):])
+
+    if device == "cpu" and model_name.endswith("all-mpnet-base-v2") and os.path.exists(MPNET_INT8_PATH):
+        try:
+            return OnnxSentenceEncoder(MPNET_INT8_PATH, MPNET_MODEL_NAME)
+        except Exception as e:
+            logging.warning(f"ONNX encoder unavailable, using SentenceTransformer: {e}")
+
+    from sentence_transformers import SentenceTransformer
+
+    if device == "cpu":
+        configure_torch_threads()
+
+    model = SentenceTransformer(model_name, device=device)
+    model.lawbrief_backend = "torch-fp32"
+    if device == "cuda":
+        model.half()
+        model.lawbrief_backend = "torch-fp16"
+    elif os.getenv(ENCODER_INT8_ENV) == "1":
+        model = _quantize_sentence_transformer(model)
+    return model
+
+
+def encoder_backend(encoder) -> str:
+    """
+    Label for how `encoder` computes embeddings ("onnx-int8", "torch-int8",
+    "torch-fp32", ...). Embeddings persisted to disk should include it in
+    their cache key, since each backend produces slightly different vectors.
+    """
+    return getattr(encoder, "lawbrief_backend", type(encoder).__name__)
+
+
+@lru_cache(maxsize=None)
+def get_sentence_encoder(model_name: str, device: str = "cpu"):
+    """
+    Process-wide shared encoder for (`model_name`, `device`).
+
+    Clause classification and risk scoring both use all-mpnet-base-v2; going
+    through this getter keeps a single copy of the weights in memory.
+    """
+    return load_sentence_encoder(model_name, device=device)
+
+
+def clear_sentence_encoders() -> None:
+    """Drop every shared encoder and release the memory it held (e.g. after switching models)."""
+    get_sentence_encoder.cache_clear()
+    gc.collect()
+    try:
+        import torch
+
+        if torch.cuda.is_available():
+            torch.cuda.empty_cache()
+    except ImportError:
+        pass
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    export_quantized_model()
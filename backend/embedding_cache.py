@@ -0,0 +1,87 @@
+# File: backend/embedding_cache.py
+"""
+Content-hash keyed LRU cache in front of a SentenceTransformer model.
+"""
+
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List
+
+import numpy as np
+
+
+class EmbeddingCache:
+    """
+    Cache sentence embeddings by a digest of the text so boilerplate
+    clauses repeated across documents are only encoded once.
+
+    Misses from a single `encode` call are batched into one model call.
+    Encoding options are fixed per cache so cached vectors stay comparable.
+    Vectors are stored as `store_dtype` (e.g. float16 to halve memory) and
+    returned as float32.
+    """
+
+    def __init__(
+        self,
+        model: Any,
+        maxsize: int = 10000,
+        store_dtype: Any = np.float32,
+        **encode_kwargs: Any
+    ) -> None:
+        self.model = model
+        self.maxsize = maxsize
+        self.store_dtype = store_dtype
+        self.encode_kwargs = encode_kwargs
+        self._cache: "OrderedDict[bytes, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(text: str) -> bytes:
+        return hashlib.blake2b(text.encode("utf-8"), digest_size=16).digest()
+
+    def encode(self, texts: List[str]) -> np.ndarray:
+        """Return a (len(texts), d) embedding matrix, encoding only cache misses."""
+        if not texts:
+            return np.empty((0, self._dimension()), dtype=np.float32)
+
+        keys = [self._key(t) for t in texts]
+        vectors: Dict[bytes, np.ndarray] = {}
+        missing: Dict[bytes, str] = {}
+
+        with self._lock:
+            for key, text in zip(keys, texts):
+                if key in self._cache:
+                    self._cache.move_to_end(key)
+                    vectors[key] = self._cache[key]
+                else:
+                    missing[key] = text
+
+        if missing:
+            encoded = self.model.encode(
+                list(missing.values()),
+                convert_to_numpy=True,
+                show_progress_bar=False,
+                **self.encode_kwargs
+            )
+            encoded = np.asarray(encoded).astype(self.store_dtype, copy=False)
+            with self._lock:
+                for key, vector in zip(missing.keys(), encoded):
+                    vectors[key] = vector
+                    self._cache[key] = vector
+                while len(self._cache) > self.maxsize:
+                    self._cache.popitem(last=False)
+
+        return np.stack([vectors[key] for key in keys]).astype(np.float32, copy=False)
+
+    def _dimension(self) -> int:
+        """Embedding width, from any cached vector or the model (0 if unknown)."""
+        with self._lock:
+            for vector in self._cache.values():
+                return len(vector)
+        get_dimension = getattr(self.model, "get_sentence_embedding_dimension", None)
+        return (get_dimension() if get_dimension else None) or 0
+
+    def clear(self) -> None:
+        with self._lock:
+            self._cache.clear()
@@ -6,8 +6,10 @@ Professional PDF and DOCX report generation module.
 import io
 import logging
 import os
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from typing import Dict, List
+from functools import lru_cache
+from typing import BinaryIO, Dict, List, Optional, Tuple, Union
 import matplotlib.pyplot as plt
 import matplotlib
 matplotlib.use('Agg')  # Use non-interactive backend
@@ -26,11 +28,19 @@ from docx.enum.text import WD_ALIGN_PARAGRAPH
 from docx.enum.section import WD_SECTION
 from docx.oxml.shared import OxmlElement, qn
 
+# Clauses as a list of dicts, or as parallel columns (see _to_soa)
+ClauseInput = Union[List[Dict], Dict[str, List]]
+
+DISCLAIMER = (
+    "Generated by LawBrief AI - This analysis is for informational purposes only "
+    "and does not constitute legal advice."
+)
+
 
 def generate_pdf_report(
-    output_path: str,
+    output_path: Union[str, BinaryIO],
     metadata: Dict,
-    clauses: List[Dict], 
+    clauses: ClauseInput, 
     risk_summary: Dict,
     summaries: Dict
 ) -> None:
@@ -38,13 +48,19 @@ def generate_pdf_report(
     Generate a professional PDF report of contract analysis.
     
     Args:
-        output_path: Path to save the PDF report
+        output_path: Path to save the PDF report, or a binary stream
+            (e.g. io.BytesIO) to write it to
         metadata: Contract metadata (filename, upload_date, etc.)
-        clauses: List of extracted clauses
+        clauses: List of extracted clauses (or their column form from _to_soa)
         risk_summary: Risk assessment results
         summaries: Document summaries
     """
     try:
+        # Column layout + id indexes, built once instead of per row
+        soa = _to_soa(clauses)
+        types_by_id = dict(zip(soa["id"], soa["type"]))
+        risks_by_id = {r["clause_id"]: r for r in risk_summary.get("clause_risks", [])}
+        
         # Create document
         doc = SimpleDocTemplate(
             output_path,
@@ -86,7 +102,7 @@ def generate_pdf_report(
             ["Document Name:", metadata.get("filename", "N/A")],
             ["Analysis Date:", metadata.get("analysis_date", datetime.now().strftime("%Y-%m-%d %H:%M"))],
             ["File Size:", metadata.get("file_size", "N/A")],
-            ["Total Clauses:", str(len(clauses))]
+            ["Total Clauses:", str(len(soa["id"]))]
         ]
         
         metadata_table = Table(metadata_data, colWidths=[2*inch, 4*inch])
@@ -109,20 +125,16 @@ def generate_pdf_report(
         story.append(Paragraph("Risk Assessment Overview", heading_style))
         
         # Create risk chart
-        risk_chart_path = _create_risk_chart(risk_summary)
-        if risk_chart_path:
-            story.append(Image(risk_chart_path, width=4*inch, height=3*inch))
+        risk_chart = _create_risk_chart(risk_summary)
+        if risk_chart:
+            story.append(Image(risk_chart, width=4*inch, height=3*inch))
             story.append(Spacer(1, 0.1*inch))
         
         # Risk summary text
-        risk_level = risk_summary.get("contract_risk_level", "Unknown")
-        risk_score = risk_summary.get("contract_risk_score", 0)
         story.append(Paragraph(
-            f"<b>Overall Risk Level:</b> {risk_level}<br/>"
-            f"<b>Risk Score:</b> {risk_score:.3f}<br/>"
-            f"<b>High Risk Clauses:</b> {risk_summary.get('high_risk_count', 0)}<br/>"
-            f"<b>Medium Risk Clauses:</b> {risk_summary.get('medium_risk_count', 0)}<br/>"
-            f"<b>Low Risk Clauses:</b> {risk_summary.get('low_risk_count', 0)}",
+            "<br/>".join(
+                f"<b>{label}:</b> {value}" for label, value in _risk_overview_rows(risk_summary)
+            ),
             styles['Normal']
         ))
         story.append(Spacer(1, 0.2*inch))
@@ -139,11 +151,9 @@ def generate_pdf_report(
         if top_risky:
             risky_data = [["ID", "Type", "Risk Level", "Score", "Matched Terms"]]
             for clause_risk in top_risky:
-                # Find the corresponding clause
-                clause = next((c for c in clauses if c["id"] == clause_risk["clause_id"]), {})
                 risky_data.append([
                     str(clause_risk["clause_id"]),
-                    clause.get("type", "Unknown")[:15],
+                    types_by_id.get(clause_risk["clause_id"], "Unknown")[:15],
                     clause_risk["risk_level"],
                     f"{clause_risk['risk_score']:.3f}",
                     ", ".join(clause_risk["matched_terms"][:3])
@@ -167,26 +177,18 @@ def generate_pdf_report(
         story.append(Paragraph("All Clauses", heading_style))
         
         # Create clauses table
-        clause_data = [["ID", "Type", "Risk Level", "Entities", "Preview"]]
-        for clause in clauses:
-            # Find risk info for this clause
-            clause_risk = next(
-                (r for r in risk_summary.get("clause_risks", []) if r["clause_id"] == clause["id"]),
-                {"risk_level": "Unknown"}
+        clause_data = [["ID", "Type", "Risk Level", "Entities", "Preview"]] + [
+            [
+                str(clause_id),
+                clause_type[:12],
+                risks_by_id.get(clause_id, {}).get("risk_level", "Unknown"),
+                _format_entities(entities)[:20],
+                _preview(text, 50)
+            ]
+            for clause_id, clause_type, text, entities in zip(
+                soa["id"], soa["type"], soa["text"], soa["entities"]
             )
-            
-            # Format entities
-            entities_text = ", ".join([ent["text"] for ent in clause.get("entities", [])[:3]])
-            if len(clause.get("entities", [])) > 3:
-                entities_text += "..."
-            
-            clause_data.append([
-                str(clause["id"]),
-                clause["type"][:12],
-                clause_risk["risk_level"],
-                entities_text[:20],
-                clause["text"][:50] + "..." if len(clause["text"]) > 50 else clause["text"]
-            ])
+        ]
         
         clause_table = Table(clause_data, colWidths=[0.4*inch, 1*inch, 0.8*inch, 1.3*inch, 2.5*inch])
         clause_table.setStyle(TableStyle([
@@ -203,19 +205,12 @@ def generate_pdf_report(
         
         # Footer
         story.append(Spacer(1, 0.3*inch))
-        story.append(Paragraph(
-            "<i>Generated by LawBrief AI - This analysis is for informational purposes only and does not constitute legal advice.</i>",
-            styles['Normal']
-        ))
+        story.append(Paragraph(f"<i>{DISCLAIMER}</i>", styles['Normal']))
         
         # Build PDF
         doc.build(story)
-        
-        # Cleanup temporary files
-        if risk_chart_path and os.path.exists(risk_chart_path):
-            os.remove(risk_chart_path)
             
-        logging.info(f"PDF report generated successfully: {output_path}")
+        logging.info(f"PDF report generated successfully: {_describe_output(output_path)}")
         
     except Exception as e:
         logging.error(f"Error generating PDF report: {e}")
@@ -223,9 +218,9 @@ def generate_pdf_report(
 
 
 def generate_docx_report(
-    output_path: str,
+    output_path: Union[str, BinaryIO],
     metadata: Dict,
-    clauses: List[Dict],
+    clauses: ClauseInput,
     risk_summary: Dict, 
     summaries: Dict
 ) -> None:
@@ -233,13 +228,19 @@ def generate_docx_report(
     Generate a professional DOCX report of contract analysis.
     
     Args:
-        output_path: Path to save the DOCX report
+        output_path: Path to save the DOCX report, or a binary stream
+            (e.g. io.BytesIO) to write it to
         metadata: Contract metadata
-        clauses: List of extracted clauses
+        clauses: List of extracted clauses (or their column form from _to_soa)
         risk_summary: Risk assessment results
         summaries: Document summaries
     """
     try:
+        # Column layout + id indexes, built once instead of per row
+        soa = _to_soa(clauses)
+        types_by_id = dict(zip(soa["id"], soa["type"]))
+        risks_by_id = {r["clause_id"]: r for r in risk_summary.get("clause_risks", [])}
+        
         # Create document
         doc = Document()
         
@@ -256,14 +257,13 @@ def generate_docx_report(
             ("Document Name:", metadata.get("filename", "N/A")),
             ("Analysis Date:", metadata.get("analysis_date", datetime.now().strftime("%Y-%m-%d %H:%M"))),
             ("File Size:", metadata.get("file_size", "N/A")),
-            ("Total Clauses:", str(len(clauses)))
+            ("Total Clauses:", str(len(soa["id"])))
         ]
         
-        for i, (label, value) in enumerate(info_data):
-            info_table.cell(i, 0).text = label
-            info_table.cell(i, 1).text = value
-            # Bold the labels
-            info_table.cell(i, 0).paragraphs[0].runs.bold = True
+        _fill_docx_table(info_table, info_data)
+        # Bold the labels
+        for row in info_table.rows:
+            _bold_cell(row.cells[0])
         
         # Executive Summary
         doc.add_heading('Executive Summary', level=1)
@@ -272,20 +272,11 @@ def generate_docx_report(
         # Risk Assessment Overview
         doc.add_heading('Risk Assessment Overview', level=1)
         
-        risk_level = risk_summary.get("contract_risk_level", "Unknown")
-        risk_score = risk_summary.get("contract_risk_score", 0)
-        
         risk_para = doc.add_paragraph()
-        risk_para.add_run("Overall Risk Level: ").bold = True
-        risk_para.add_run(f"{risk_level}\n")
-        risk_para.add_run("Risk Score: ").bold = True
-        risk_para.add_run(f"{risk_score:.3f}\n")
-        risk_para.add_run("High Risk Clauses: ").bold = True
-        risk_para.add_run(f"{risk_summary.get('high_risk_count', 0)}\n")
-        risk_para.add_run("Medium Risk Clauses: ").bold = True
-        risk_para.add_run(f"{risk_summary.get('medium_risk_count', 0)}\n")
-        risk_para.add_run("Low Risk Clauses: ").bold = True
-        risk_para.add_run(f"{risk_summary.get('low_risk_count', 0)}")
+        overview_rows = _risk_overview_rows(risk_summary)
+        for i, (label, value) in enumerate(overview_rows):
+            risk_para.add_run(f"{label}: ").bold = True
+            risk_para.add_run(value if i == len(overview_rows) - 1 else f"{value}\n")
         
         # Detailed Analysis
         doc.add_heading('Detailed Analysis', level=1)
@@ -299,21 +290,22 @@ def generate_docx_report(
             risky_table = doc.add_table(rows=len(top_risky) + 1, cols=5)
             risky_table.style = 'Table Grid'
             
-            # Headers
             headers = ["ID", "Type", "Risk Level", "Score", "Matched Terms"]
-            for i, header in enumerate(headers):
-                cell = risky_table.cell(0, i)
-                cell.text = header
-                cell.paragraphs[0].runs.bold = True
+            risky_rows = [headers] + [
+                [
+                    str(clause_risk["clause_id"]),
+                    types_by_id.get(clause_risk["clause_id"], "Unknown"),
+                    clause_risk["risk_level"],
+                    f"{clause_risk['risk_score']:.3f}",
+                    ", ".join(clause_risk["matched_terms"][:3])
+                ]
+                for clause_risk in top_risky
+            ]
+            _fill_docx_table(risky_table, risky_rows)
             
-            # Data
-            for row_idx, clause_risk in enumerate(top_risky, 1):
-                clause = next((c for c in clauses if c["id"] == clause_risk["clause_id"]), {})
-                risky_table.cell(row_idx, 0).text = str(clause_risk["clause_id"])
-                risky_table.cell(row_idx, 1).text = clause.get("type", "Unknown")
-                risky_table.cell(row_idx, 2).text = clause_risk["risk_level"]
-                risky_table.cell(row_idx, 3).text = f"{clause_risk['risk_score']:.3f}"
-                risky_table.cell(row_idx, 4).text = ", ".join(clause_risk["matched_terms"][:3])
+            # Bold the headers
+            for cell in risky_table.rows[0].cells:
+                _bold_cell(cell)
         
         # Add page break
         doc.add_page_break()
@@ -321,15 +313,14 @@ def generate_docx_report(
         # All Clauses
         doc.add_heading('All Clauses', level=1)
         
-        for clause in clauses:
+        for clause_id, clause_type, text, entities in zip(
+            soa["id"], soa["type"], soa["text"], soa["entities"]
+        ):
             # Find risk info
-            clause_risk = next(
-                (r for r in risk_summary.get("clause_risks", []) if r["clause_id"] == clause["id"]),
-                {"risk_level": "Unknown", "risk_score": 0}
-            )
+            clause_risk = risks_by_id.get(clause_id, {"risk_level": "Unknown", "risk_score": 0})
             
             # Clause heading
-            clause_heading = doc.add_heading(f'Clause {clause["id"]}: {clause["type"]}', level=2)
+            clause_heading = doc.add_heading(f'Clause {clause_id}: {clause_type}', level=2)
             
             # Risk info
             risk_para = doc.add_paragraph()
@@ -340,91 +331,206 @@ def generate_docx_report(
             risk_para.add_run(")").italic = True
             
             # Entities
-            if clause.get("entities"):
+            if entities:
                 entities_para = doc.add_paragraph()
                 entities_para.add_run("Entities: ").bold = True
-                entity_texts = [f"{ent['text']} ({ent['label']})" for ent in clause["entities"]]
+                entity_texts = [f"{ent['text']} ({ent['label']})" for ent in entities]
                 entities_para.add_run(", ".join(entity_texts))
             
             # Clause text
-            doc.add_paragraph(clause["text"])
+            doc.add_paragraph(text)
             doc.add_paragraph("")  # Spacer
         
         # Footer
         footer_para = doc.add_paragraph()
         footer_para.alignment = WD_ALIGN_PARAGRAPH.CENTER
-        footer_run = footer_para.add_run(
-            "Generated by LawBrief AI - This analysis is for informational purposes only and does not constitute legal advice."
-        )
+        footer_run = footer_para.add_run(DISCLAIMER)
         footer_run.italic = True
         footer_run.font.size = Pt(10)
         
         # Save document
         doc.save(output_path)
-        logging.info(f"DOCX report generated successfully: {output_path}")
+        logging.info(f"DOCX report generated successfully: {_describe_output(output_path)}")
         
     except Exception as e:
         logging.error(f"Error generating DOCX report: {e}")
         raise
 
 
-def _create_risk_chart(risk_summary: Dict) -> str:
+def generate_reports(
+    output_dir: str,
+    metadata: Dict,
+    clauses: ClauseInput,
+    risk_summary: Dict,
+    summaries: Dict,
+    formats: Tuple[str, ...] = ("pdf", "docx")
+) -> Dict[str, str]:
     """
-    Create a risk distribution chart and return the file path.
+    Generate several report formats concurrently from the same analysis.
+    
+    Args:
+        output_dir: Directory to write the reports into
+        metadata: Contract metadata
+        clauses: List of extracted clauses (or their column form from _to_soa)
+        risk_summary: Risk assessment results
+        summaries: Document summaries
+        formats: Report formats to produce ("pdf" and/or "docx")
+        
+    Returns:
+        Mapping of format to the generated report path
+    """
+    generators = {"pdf": generate_pdf_report, "docx": generate_docx_report}
+    # Convert once; both generators accept the column form directly
+    clauses = _to_soa(clauses)
+    unknown = [fmt for fmt in formats if fmt not in generators]
+    if unknown:
+        raise ValueError(f"Unsupported report format(s): {', '.join(unknown)}")
+    
+    os.makedirs(output_dir, exist_ok=True)
+    stem = os.path.splitext(os.path.basename(metadata.get("filename", "contract")))[0]
+    paths = {
+        fmt: os.path.join(output_dir, f"lawbrief_report_{stem}.{fmt}")
+        for fmt in formats
+    }
+    
+    with ThreadPoolExecutor(max_workers=len(paths) or 1) as executor:
+        futures = [
+            executor.submit(generators[fmt], path, metadata, clauses, risk_summary, summaries)
+            for fmt, path in paths.items()
+        ]
+        # Re-raise the first failure, if any
+        for future in futures:
+            future.result()
+    
+    return paths
+
+
+def _describe_output(output_path: Union[str, BinaryIO]) -> str:
+    return output_path if isinstance(output_path, str) else "<in-memory stream>"
+
+
+def _risk_overview_rows(risk_summary: Dict) -> List[Tuple[str, str]]:
+    """Label/value pairs for the risk overview block shared by both report formats."""
+    return [
+        ("Overall Risk Level", str(risk_summary.get("contract_risk_level", "Unknown"))),
+        ("Risk Score", f"{risk_summary.get('contract_risk_score', 0):.3f}"),
+        ("High Risk Clauses", str(risk_summary.get("high_risk_count", 0))),
+        ("Medium Risk Clauses", str(risk_summary.get("medium_risk_count", 0))),
+        ("Low Risk Clauses", str(risk_summary.get("low_risk_count", 0)))
+    ]
+
+
+def _to_soa(clauses: ClauseInput) -> Dict[str, List]:
+    """
+    Convert a list of clause dicts into parallel column lists
+    (`id`, `type`, `text`, `entities`) indexed by position.
+    Input already in column form is returned unchanged.
+    """
+    if isinstance(clauses, dict):
+        return clauses
+    return {
+        "id": [c["id"] for c in clauses],
+        "type": [c["type"] for c in clauses],
+        "text": [c["text"] for c in clauses],
+        "entities": [c.get("entities", []) for c in clauses]
+    }
+
+
+def _format_entities(entities: List[Dict], limit: int = 3) -> str:
+    """Comma-join the first few entity texts, marking truncation with '...'."""
+    text = ", ".join(ent["text"] for ent in entities[:limit])
+    return text + "..." if len(entities) > limit else text
+
+
+def _preview(text: str, length: int) -> str:
+    """Truncate text to `length` characters with a trailing ellipsis."""
+    return text[:length] + "..." if len(text) > length else text
+
+
+def _fill_docx_table(table, rows: List[List[str]]) -> None:
+    """
+    Write row values into a python-docx table.
+    
+    Iterates `table.rows` / `row.cells` once; `table.cell(r, c)` rebuilds the
+    whole cell grid on every call.
+    """
+    for row, values in zip(table.rows, rows):
+        for cell, value in zip(row.cells, values):
+            cell.text = value
+
+
+def _bold_cell(cell) -> None:
+    """Bold every run in the first paragraph of a table cell."""
+    for run in cell.paragraphs[0].runs:
+        run.bold = True
+
+
+def _create_risk_chart(risk_summary: Dict) -> Optional[io.BytesIO]:
+    """
+    Create a risk distribution chart as an in-memory PNG.
     
     Args:
         risk_summary: Risk assessment summary
         
     Returns:
-        Path to the generated chart image
+        BytesIO buffer with the chart image, or None if there is no data
     """
     try:
         risk_dist = risk_summary.get("risk_distribution", {"Low": 0, "Medium": 0, "High": 0})
         
         # Filter out zero values
-        filtered_dist = {k: v for k, v in risk_dist.items() if v > 0}
+        dist_key = tuple((k, v) for k, v in risk_dist.items() if v > 0)
         
-        if not filtered_dist:
+        if not dist_key:
             return None
         
-        # Create pie chart
-        fig, ax = plt.subplots(figsize=(6, 4))
-        
-        labels = list(filtered_dist.keys())
-        sizes = list(filtered_dist.values())
-        colors = {'Low': '#90EE90', 'Medium': '#FFD700', 'High': '#FF6B6B'}
-        chart_colors = [colors.get(label, '#CCCCCC') for label in labels]
-        
-        wedges, texts, autotexts = ax.pie(
-            sizes, 
-            labels=labels, 
-            colors=chart_colors,
-            autopct='%1.1f%%',
-            startangle=90
-        )
-        
-        # Style the chart
-        ax.set_title('Risk Distribution', fontsize=14, fontweight='bold')
-        
-        # Make percentage text bold
-        for autotext in autotexts:
-            autotext.set_color('white')
-            autotext.set_fontweight('bold')
-        
-        plt.tight_layout()
-        
-        # Save to temporary file
-        temp_path = "temp_risk_chart.png"
-        plt.savefig(temp_path, dpi=150, bbox_inches='tight')
-        plt.close()
-        
-        return temp_path
+        return io.BytesIO(_render_risk_chart_png(dist_key))
         
     except Exception as e:
         logging.error(f"Error creating risk chart: {e}")
         return None
 
 
+@lru_cache(maxsize=64)
+def _render_risk_chart_png(dist_key: Tuple[Tuple[str, int], ...]) -> bytes:
+    """
+    Render the risk distribution pie chart to PNG bytes.
+    
+    Cached on the (label, count) pairs since only a handful of distinct
+    distributions occur in practice.
+    """
+    fig, ax = plt.subplots(figsize=(6, 4))
+    
+    labels = [label for label, _ in dist_key]
+    sizes = [size for _, size in dist_key]
+    colors = {'Low': '#90EE90', 'Medium': '#FFD700', 'High': '#FF6B6B'}
+    chart_colors = [colors.get(label, '#CCCCCC') for label in labels]
+    
+    wedges, texts, autotexts = ax.pie(
+        sizes, 
+        labels=labels, 
+        colors=chart_colors,
+        autopct='%1.1f%%',
+        startangle=90
+    )
+    
+    # Style the chart
+    ax.set_title('Risk Distribution', fontsize=14, fontweight='bold')
+    
+    # Make percentage text bold
+    for autotext in autotexts:
+        autotext.set_color('white')
+        autotext.set_fontweight('bold')
+    
+    fig.tight_layout()
+    
+    buf = io.BytesIO()
+    fig.savefig(buf, format="png", dpi=150, bbox_inches='tight')
+    plt.close(fig)
+    
+    return buf.getvalue()
+
+
 if __name__ == "__main__":
     # Demo functionality
     logging.basicConfig(level=logging.INFO)
@@ -286,10 +286,13 @@ Fully compatible with updated clause_extractor output.
 import streamlit as st
 import logging
 import re
-from typing import Dict, List
+from functools import lru_cache
+from typing import Dict, List, Optional
+import ahocorasick
 import numpy as np
-from sentence_transformers import SentenceTransformer
-from sklearn.metrics.pairwise import cosine_similarity
+
+from .embedding_backend import get_sentence_encoder, resolve_model_name
+from .embedding_cache import EmbeddingCache
 
 # --------------------------------------------------------------------
 # Load high-accuracy sentence transformer for legal/contract text
@@ -299,15 +302,25 @@ from sklearn.metrics.pairwise import cosine_similarity
 # except Exception as e:
 #     logging.error(f"Failed to load sentence transformer: {e}")
 #     raise
+# torch / sentence_transformers are imported on first use, so importing this
+# module (e.g. for get_risk_recommendations) stays cheap
 @st.cache_resource(show_spinner=False)
 def _load_sentence_model():
-    return SentenceTransformer('all-mpnet-base-v2')
+    import torch
 
-try:
-    sentence_model = _load_sentence_model()
-except Exception as e:
-    logging.error(f"Failed to load sentence transformer: {e}")
-    raise
+    device = "cuda" if torch.cuda.is_available() else "cpu"
+    # Same instance as the clause extractor's encoder when the names match
+    return get_sentence_encoder(resolve_model_name('all-mpnet-base-v2'), device=device)
+
+def get_sentence_model():
+    """
+    Return the risk sentence encoder, loading it on first call.
+    """
+    try:
+        return _load_sentence_model()
+    except Exception as e:
+        logging.error(f"Failed to load sentence transformer: {e}")
+        raise
 
 
 # --------------------------------------------------------------------
@@ -354,10 +367,33 @@ RISKY_EXAMPLES = [
     "Contractor assumes unlimited liability for any breach of confidentiality provisions."
 ]
 
-# Precompute embeddings
-RISKY_EMBEDDINGS = sentence_model.encode(
-    RISKY_EXAMPLES, normalize_embeddings=True
-)
+@lru_cache(maxsize=1)
+def _get_risky_emb_t() -> np.ndarray:
+    """
+    Embeddings of RISKY_EXAMPLES, computed on first use and transposed once
+    (contiguous) so each similarity matmul hands BLAS a ready (d, 7) operand.
+    """
+    import torch
+
+    with torch.inference_mode():
+        risky_embeddings = get_sentence_model().encode(
+            RISKY_EXAMPLES, normalize_embeddings=True, convert_to_numpy=True
+        )
+    return np.ascontiguousarray(risky_embeddings.T, dtype=np.float32)
+
+@lru_cache(maxsize=1)
+def _get_clause_embedding_cache() -> EmbeddingCache:
+    """
+    Repeated clause texts (standard indemnity, arbitration, ...) skip re-encoding
+    (stored as fp16: similarity against 7 examples is insensitive to the rounding).
+    """
+    return EmbeddingCache(
+        get_sentence_model(),
+        maxsize=10000,
+        store_dtype=np.float16,
+        batch_size=64,
+        normalize_embeddings=True
+    )
 
 # Clause type weighting
 CLAUSE_TYPE_WEIGHTS = {
@@ -370,25 +406,137 @@ CLAUSE_TYPE_WEIGHTS = {
     "dispute resolution": 0.8
 }
 
+# 🔹 Extra realism for liability-heavy clauses
+BOOSTED_CLAUSE_TYPES = {"liability", "indemnification"}
+
+# Clause type -> integer code indexing TYPE_WEIGHTS_ARR, whose weights
+# already include the boost; the last slot (0.0) is for unknown types
+TYPE_CODES = {clause_type: i for i, clause_type in enumerate(CLAUSE_TYPE_WEIGHTS)}
+UNKNOWN_TYPE_CODE = len(TYPE_CODES)
+TYPE_WEIGHTS_ARR = np.array(
+    [
+        min(weight + 0.1, 1.0) if clause_type in BOOSTED_CLAUSE_TYPES else weight
+        for clause_type, weight in CLAUSE_TYPE_WEIGHTS.items()
+    ] + [0.0],
+    dtype=np.float64
+)
+
+# Risk levels in code order: np.digitize(scores, RISK_LEVEL_THRESHOLDS) indexes this
+RISK_LEVELS = ("Low", "Medium", "High")
+RISK_LEVEL_THRESHOLDS = np.array([0.3, 0.6], dtype=np.float64)
+
+def _literal_seed(pattern: str) -> str:
+    """
+    Leading literal every match of `pattern` must contain, e.g. "indemnif"
+    for r"\bindemnif(y|ication|ies)?\b". Used as a cheap substring prefilter.
+    """
+    match = re.match(r"(?:\\b)?([^\\()\[\]?*+{}|.^$]*)(.?)", pattern)
+    seed, next_char = match.group(1), match.group(2)
+    if next_char in ("?", "*", "{"):
+        # The quantifier makes the last literal character optional
+        seed = seed[:-1]
+    return seed.lower()
+
+# Risk patterns compiled once at import: (seed, pattern, weight, display label)
+_RISK_PATTERNS = [
+    (_literal_seed(pattern), re.compile(pattern, re.IGNORECASE), weight, pattern.strip(r"\b"))
+    for pattern, weight in RISK_KEYWORDS.items()
+]
+
+def _build_seed_automaton() -> ahocorasick.Automaton:
+    """
+    One automaton over every pattern's literal seed, each mapping to the
+    indexes of the patterns it can start, so one scan of a clause yields
+    the only patterns whose regex can match.
+    """
+    patterns_by_seed: Dict[str, List[int]] = {}
+    for idx, (seed, _, _, _) in enumerate(_RISK_PATTERNS):
+        if seed:
+            patterns_by_seed.setdefault(seed, []).append(idx)
+
+    automaton = ahocorasick.Automaton()
+    for seed, indexes in patterns_by_seed.items():
+        automaton.add_word(seed, tuple(indexes))
+    automaton.make_automaton()
+    return automaton
+
+_RISK_SEED_AUTOMATON = _build_seed_automaton()
+# Patterns without a literal seed cannot be prefiltered
+_UNSEEDED_PATTERNS = frozenset(idx for idx, (seed, _, _, _) in enumerate(_RISK_PATTERNS) if not seed)
+
 # --------------------------------------------------------------------
 # Main API
 # --------------------------------------------------------------------
-def assess_risks(clauses: List[Dict]) -> Dict:
+def assess_risks(clauses: List[Dict], embeddings: Optional[np.ndarray] = None) -> Dict:
     """
     Assess risk levels for contract clauses and generate overall contract risk summary.
+
+    `embeddings` may carry normalized clause embeddings from the same encoder
+    (e.g. `clause_extractor.get_clause_embeddings`) to skip encoding here.
     """
     try:
-        clause_risks = []
-        total_risk_score = 0
-        risk_counts = {"Low": 0, "Medium": 0, "High": 0}
+        texts = [clause["text"] for clause in clauses]
+        n = len(texts)
+
+        # Encode every clause in one batched forward pass and score all of
+        # them against the risky examples with a single matmul
+        try:
+            if embeddings is None or len(embeddings) != n:
+                embeddings = _encode_clause_texts(texts)
+            max_similarities = _max_risky_similarities(embeddings).astype(np.float64)
+        except Exception as e:
+            logging.warning(f"Similarity computation error: {e}")
+            max_similarities = np.zeros(n)
+
+        # 1. Keyword-based risk scoring, once per distinct clause text
+        # (the embedding cache already encodes each distinct text once)
+        keyword_by_text = {text: _keyword_risk_score(text.lower()) for text in dict.fromkeys(texts)}
+        keyword_results = [keyword_by_text[text] for text in texts]
+        keyword_scores = np.fromiter((score for score, _ in keyword_results), dtype=np.float64, count=n)
+
+        # 2. Semantic similarity, with the boost for very strong matches
+        similarity_scores = np.where(
+            max_similarities > 0.75, np.minimum(max_similarities + 0.05, 1.0), max_similarities
+        )
 
-        for clause in clauses:
-            risk_assessment = _assess_clause_risk(clause)
-            clause_risks.append(risk_assessment)
-            total_risk_score += risk_assessment["risk_score"]
-            risk_counts[risk_assessment["risk_level"]] += 1
+        # 3. Length/complexity factor
+        lengths = np.fromiter((len(text) for text in texts), dtype=np.float64, count=n)
+        length_factors = np.minimum(lengths / 300.0, 2.0) / 2.0
 
-        avg_risk_score = total_risk_score / len(clauses) if clauses else 0
+        # 4. Clause type boost, looked up by integer type code
+        type_codes = np.fromiter(
+            (_type_code(clause.get("type", "")) for clause in clauses), dtype=np.intp, count=n
+        )
+        type_boosts = TYPE_WEIGHTS_ARR[type_codes]
+
+        scores, level_codes = _finalize_scores(
+            keyword_scores, similarity_scores, length_factors, type_boosts
+        )
+
+        # Back to plain Python floats for the per-clause dicts
+        risk_scores, codes = scores.tolist(), level_codes.tolist()
+        kw_list, sim_list = keyword_scores.tolist(), similarity_scores.tolist()
+        lf_list, tb_list = length_factors.tolist(), type_boosts.tolist()
+
+        clause_risks = [
+            {
+                "clause_id": clause.get("id"),
+                "risk_score": risk_scores[i],
+                "risk_level": RISK_LEVELS[codes[i]],
+                "matched_terms": list(keyword_results[i][1]),
+                "keyword_score": kw_list[i],
+                "similarity_score": sim_list[i],
+                "length_factor": lf_list[i],
+                "type_boost": tb_list[i]
+            }
+            for i, clause in enumerate(clauses)
+        ]
+
+        # Summary statistics as array reductions
+        level_counts = np.bincount(level_codes, minlength=len(RISK_LEVELS))
+        risk_counts = {level: int(count) for level, count in zip(RISK_LEVELS, level_counts)}
+
+        avg_risk_score = float(scores.mean()) if scores.size else 0
 
         # 🔹 Subtle elevation if any high-risk clause exists
         if risk_counts["High"] > 0:
@@ -396,9 +544,7 @@ def assess_risks(clauses: List[Dict]) -> Dict:
 
         contract_risk_level = _score_to_level(avg_risk_score)
 
-        top_risky = sorted(
-            clause_risks, key=lambda x: x["risk_score"], reverse=True
-        )[:5]
+        top_risky = [clause_risks[i] for i in _top_k_indices(scores, 5)]
 
         return {
             "clause_risks": clause_risks,
@@ -429,80 +575,55 @@ def assess_risks(clauses: List[Dict]) -> Dict:
 # --------------------------------------------------------------------
 # Internal helpers
 # --------------------------------------------------------------------
-def _assess_clause_risk(clause: Dict) -> Dict:
+def _encode_clause_texts(texts: List[str]) -> np.ndarray:
     """
-    Assess risk for a single clause.
+    Encode clause texts in a single batched call (normalized embeddings).
+    Boilerplate clauses seen before are served from the content-hash cache.
     """
-    text = clause["text"]
-    text_lower = text.lower()
+    if not texts:
+        return np.zeros((0, _get_risky_emb_t().shape[0]), dtype=np.float32)
 
-    # 1. Keyword-based risk scoring
-    keyword_score, matched_terms = _keyword_risk_score(text_lower)
+    import torch
 
-    # 2. Semantic similarity
-    try:
-        clause_embedding = sentence_model.encode(
-            [text], normalize_embeddings=True
-        )
-        similarities = cosine_similarity(
-            clause_embedding, RISKY_EMBEDDINGS
-        )[0]
-        max_similarity = float(np.max(similarities))
-
-        # 🔹 Boost very strong semantic matches
-        if max_similarity > 0.75:
-            max_similarity = min(max_similarity + 0.05, 1.0)
-
-    except Exception as e:
-        logging.warning(f"Similarity computation error: {e}")
-        max_similarity = 0.0
-
-    # 3. Length/complexity factor
-    length_factor = min(len(text) / 300.0, 2.0) / 2.0
-
-    # 4. Clause type boost
-    clause_type = clause.get("type", "").lower()
-    type_boost = CLAUSE_TYPE_WEIGHTS.get(clause_type, 0.0)
-
-    # 🔹 Extra realism for liability-heavy clauses
-    if clause_type in {"liability", "indemnification"}:
-        type_boost = min(type_boost + 0.1, 1.0)
-
-    # Combined weighted score
-    raw_score = (
-        0.5 * keyword_score +
-        0.3 * max_similarity +
-        0.1 * length_factor +
-        0.1 * type_boost
-    )
+    with torch.inference_mode():
+        return _get_clause_embedding_cache().encode(texts)
 
-    risk_level = _score_to_level(raw_score)
+def _max_risky_similarities(embeddings: np.ndarray) -> np.ndarray:
+    """
+    Highest cosine similarity of each clause embedding to the risky examples.
+    Both sides are L2-normalized, so one (N, d) x (d, 7) matmul gives cosines.
+    """
+    return (embeddings @ _get_risky_emb_t()).max(axis=1)
 
-    return {
-        "clause_id": clause.get("id"),
-        "risk_score": raw_score,
-        "risk_level": risk_level,
-        "matched_terms": matched_terms,
-        "keyword_score": keyword_score,
-        "similarity_score": max_similarity,
-        "length_factor": length_factor,
-        "type_boost": type_boost
-    }
+def _type_code(clause_type: str) -> int:
+    """
+    Integer code of a clause type (UNKNOWN_TYPE_CODE if unweighted).
+    """
+    return TYPE_CODES.get(clause_type.lower(), UNKNOWN_TYPE_CODE)
 
 def _keyword_risk_score(text: str):
     """
     Compute keyword risk score using weighted regex matching.
+    Expects lowercased text: a single Aho-Corasick pass finds which literal
+    seeds occur, and only the regexes of those patterns run.
     """
     matched_terms = []
     total_weight = 0
     high_weight_hits = 0
 
-    for pattern, weight in RISK_KEYWORDS.items():
-        if re.search(pattern, text, re.IGNORECASE):
-            matched_terms.append(pattern.strip(r"\b"))
-            total_weight += weight
-            if weight >= 0.8:
-                high_weight_hits += 1
+    candidates = set(_UNSEEDED_PATTERNS)
+    for _, indexes in _RISK_SEED_AUTOMATON.iter(text):
+        candidates.update(indexes)
+
+    # Pattern order, so matched_terms keeps the RISK_KEYWORDS order
+    for idx in sorted(candidates):
+        _, regex, weight, label = _RISK_PATTERNS[idx]
+        if not regex.search(text):
+            continue
+        matched_terms.append(label)
+        total_weight += weight
+        if weight >= 0.8:
+            high_weight_hits += 1
 
     keyword_score = min(total_weight / 5.0, 1.0)
 
@@ -523,6 +644,35 @@ def _score_to_level(score: float) -> str:
     else:
         return "High"
 
+def _finalize_scores(
+    keyword_scores: np.ndarray,
+    similarity_scores: np.ndarray,
+    length_factors: np.ndarray,
+    type_boosts: np.ndarray
+):
+    """
+    Combined weighted scores and their level codes for a batch of clauses.
+    """
+    scores = 0.5 * keyword_scores + 0.3 * similarity_scores + 0.1 * length_factors + 0.1 * type_boosts
+    return scores, _score_to_level_codes(scores)
+
+def _top_k_indices(scores: np.ndarray, k: int) -> np.ndarray:
+    """
+    Indices of the k highest scores, highest first. Ties keep clause order,
+    matching a stable descending sort, but selection is O(N) via partition.
+    """
+    if scores.size <= k:
+        return np.argsort(-scores, kind="stable")
+    kth_largest = np.partition(scores, scores.size - k)[scores.size - k]
+    candidates = np.flatnonzero(scores >= kth_largest)
+    return candidates[np.argsort(-scores[candidates], kind="stable")[:k]]
+
+def _score_to_level_codes(scores: np.ndarray) -> np.ndarray:
+    """
+    Vectorized `_score_to_level`: 0/1/2 codes indexing RISK_LEVELS.
+    """
+    return np.digitize(scores, RISK_LEVEL_THRESHOLDS)
+
 # --------------------------------------------------------------------
 # Recommendations generator
 # --------------------------------------------------------------------
@@ -6,35 +6,119 @@ Supports extractive, abstractive, and hybrid summarization modes with
 robust chunking, semantic ranking, and clause-level summarization.
 """
 
+import hashlib
 import logging
+import os
 import re
-from typing import Dict, List, Literal, Optional
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Dict, List, Literal, Optional, Tuple
 import numpy as np
-from transformers import pipeline, AutoTokenizer
-from sentence_transformers import SentenceTransformer
-from sklearn.metrics.pairwise import cosine_similarity
-import networkx as nx
 
+from .embedding_backend import configure_torch_threads, get_sentence_encoder
+from .embedding_cache import EmbeddingCache
 from .utils import chunk_text, clean_text
 
 # -------------------------
 # Model Initialization
 # -------------------------
-try:
-    # Abstractive model (BART)
-    abstractive_summarizer = pipeline(
-        "summarization",
-        model="facebook/bart-large-cnn",
-        device=-1  # CPU
+# Distilled BART-large-CNN (12 encoder / 6 decoder layers): near-identical
+# ROUGE, noticeably faster generation on CPU
+SUMMARY_MODEL_NAME = "sshleifer/distilbart-cnn-12-6"
+
+# Set LAWBRIEF_BART_INT8=0 to run BART in full fp32
+BART_INT8_ENV = "LAWBRIEF_BART_INT8"
+
+
+def _load_bart(model_name: str):
+    """
+    Load the seq2seq summarizer for CPU inference. Linear layers are
+    dynamically quantized to int8 (weights int8, activations quantized on
+    the fly), which is where almost all of BART's CPU time goes.
+    """
+    import torch
+    from transformers import AutoModelForSeq2SeqLM
+
+    configure_torch_threads()
+    model = AutoModelForSeq2SeqLM.from_pretrained(model_name).eval()
+    if os.getenv(BART_INT8_ENV, "1") != "0":
+        model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+    return model
+
+
+# Models load on first use (once per process), so importing this module
+# stays cheap for code that never summarizes
+@lru_cache(maxsize=None)
+def get_bart_tokenizer():
+    """Tokenizer of the abstractive model."""
+    from transformers import AutoTokenizer
+
+    try:
+        return AutoTokenizer.from_pretrained(SUMMARY_MODEL_NAME, use_fast=True)
+    except Exception as e:
+        logging.error(f"[Summarizer] Model loading failed: {e}")
+        raise
+
+
+@lru_cache(maxsize=None)
+def get_abstractive_summarizer():
+    """Abstractive model (BART) summarization pipeline."""
+    from transformers import pipeline
+
+    try:
+        return pipeline(
+            "summarization",
+            model=_load_bart(SUMMARY_MODEL_NAME),
+            tokenizer=get_bart_tokenizer(),
+            device=-1  # CPU
+        )
+    except Exception as e:
+        logging.error(f"[Summarizer] Model loading failed: {e}")
+        raise
+
+
+@lru_cache(maxsize=None)
+def _get_sentence_embedding_cache() -> EmbeddingCache:
+    """
+    Embedding model for extractive, behind a content-hash cache: sentences
+    recur across documents and across hybrid/extractive fallbacks.
+    SentenceTransformer.encode already length-sorts each call into batches
+    (smart batching), so larger batches waste little on padding.
+    """
+    import torch
+
+    try:
+        device = "cuda" if torch.cuda.is_available() else "cpu"
+        sentence_model = get_sentence_encoder("all-MiniLM-L6-v2", device=device)
+    except Exception as e:
+        logging.error(f"[Summarizer] Model loading failed: {e}")
+        raise
+    return EmbeddingCache(
+        sentence_model, maxsize=50000, batch_size=64, normalize_embeddings=True
     )
-    bart_tokenizer = AutoTokenizer.from_pretrained("facebook/bart-large-cnn")
 
-    # Embedding model for extractive
-    sentence_model = SentenceTransformer("all-MiniLM-L6-v2")
+_SENTENCE_SPLIT_RE = re.compile(r"[.!?]+")
+
+# Extractive TextRank switches to a sparse k-NN graph from this many sentences
+KNN_GRAPH_MIN_SENTENCES = 300
+KNN_NEIGHBORS = 10
+
+# BART's context window, in tokens (special tokens included)
+BART_MAX_TOKENS = 1024
 
-except Exception as e:
-    logging.error(f"[Summarizer] Model loading failed: {e}")
-    raise
+# Texts per padded BART forward pass when summarizing many at once
+SUMMARY_BATCH_SIZE = 8
+
+# Boilerplate clauses recur across contracts: remember BART outputs by
+# (text digest, max_length) so a repeat costs a dict lookup, not a forward pass
+SUMMARY_CACHE_SIZE = 4096
+_summary_cache: "OrderedDict[Tuple[bytes, int], str]" = OrderedDict()
+_summary_cache_lock = threading.Lock()
+
+# One generation at a time per process: concurrent sessions queue for the
+# pipeline instead of oversubscribing the cores torch already uses
+_generation_lock = threading.Lock()
 
 
 # -------------------------
@@ -65,31 +149,24 @@ def summarize_document(
         }
 
         if mode == "abstractive":
-            result["short_summary"] = safe_abstractive_summarize(text, max_length=128)
-            result["long_summary"] = safe_abstractive_summarize(text, max_length=256)
+            result["short_summary"], result["long_summary"] = _abstractive_short_and_long(text)
 
         elif mode == "extractive":
-            result["short_summary"] = " ".join(_extract_key_sentences(text, 3))
-            result["long_summary"] = " ".join(_extract_key_sentences(text, 6))
+            result["short_summary"], result["long_summary"] = _extractive_short_and_long(text)
 
         elif mode == "hybrid":
             try:
                 # Abstractive for main summaries
-                result["short_summary"] = safe_abstractive_summarize(text, max_length=128)
-                result["long_summary"] = safe_abstractive_summarize(text, max_length=256)
+                result["short_summary"], result["long_summary"] = _abstractive_short_and_long(text)
             except Exception as e:
                 logging.warning(f"[Hybrid] Abstractive failed, falling back to extractive: {e}")
-                result["short_summary"] = " ".join(_extract_key_sentences(text, 3))
-                result["long_summary"] = " ".join(_extract_key_sentences(text, 6))
+                result["short_summary"], result["long_summary"] = _extractive_short_and_long(text)
 
-        # Per-clause summaries
+        # Per-clause summaries (batched through the pipeline)
         if clauses:
-            for clause in clauses:
-                clause_text = clean_text(clause.get("text", ""))
-                try:
-                    clause_summary = safe_abstractive_summarize(clause_text, max_length=64)
-                except Exception:
-                    clause_summary = _first_sentence_fallback(clause_text)
+            clause_texts = [clean_text(clause.get("text", "")) for clause in clauses]
+            clause_summaries = safe_abstractive_summarize_many(clause_texts, max_length=64)
+            for clause, clause_summary in zip(clauses, clause_summaries):
                 result["per_clause_summaries"].append({
                     "clause_id": clause.get("id"),
                     "clause_type": clause.get("type"),
@@ -154,13 +231,12 @@ def safe_abstractive_summarize(text: str, max_length: int = 256) -> str:
         return text.strip()
 
     try:
-        tokens = bart_tokenizer.encode(text, truncation=False)
-        if len(tokens) <= 1024:
+        if _token_counts([text])[0] <= BART_MAX_TOKENS:
             return _abstractive_single_pass(text, max_length)
 
         # Chunk & summarize
         chunks = chunk_text(text, max_chars=3000)
-        chunk_summaries = [_abstractive_chunk(c) for c in chunks]
+        chunk_summaries = _abstractive_chunks(chunks)
 
         combined = " ".join(chunk_summaries)
 
@@ -176,55 +252,285 @@ def safe_abstractive_summarize(text: str, max_length: int = 256) -> str:
         return " ".join(_extract_key_sentences(text, 3))
 
 
+def _abstractive_short_and_long(text: str) -> Tuple[str, str]:
+    """
+    Short and long abstractive summaries with one pass over the full document:
+    the short summary compresses the long one (a ~256-token input).
+    """
+    long_summary = safe_abstractive_summarize(text, max_length=256)
+    short_summary = safe_abstractive_summarize(long_summary, max_length=128)
+    return short_summary, long_summary
+
+
+def safe_abstractive_summarize_many(texts: List[str], max_length: int = 64) -> List[str]:
+    """
+    Batched `safe_abstractive_summarize` for many short texts (e.g. clauses).
+    Texts that fit BART's context go through one padded pipeline call;
+    longer texts, and every text if the batch fails, take the per-text path.
+    """
+    summaries = [text.strip() for text in texts]
+    candidates = [i for i, text in enumerate(texts) if len(text.split()) >= 20]
+    if not candidates:
+        return summaries
+
+    try:
+        token_lengths = _token_counts([texts[i] for i in candidates])
+        batch_idx = [i for i, n in zip(candidates, token_lengths) if n <= BART_MAX_TOKENS]
+        long_idx = [i for i, n in zip(candidates, token_lengths) if n > BART_MAX_TOKENS]
+
+        if batch_idx:
+            outputs = _bart_summarize(
+                [texts[i] for i in batch_idx], max_length, truncation=True
+            )
+            for i, summary in zip(batch_idx, outputs):
+                summaries[i] = summary
+    except Exception as e:
+        logging.warning(f"[Summarizer] Batched summarization failed, summarizing one by one: {e}")
+        long_idx = candidates
+
+    for i in long_idx:
+        try:
+            summaries[i] = safe_abstractive_summarize(texts[i], max_length=max_length)
+        except Exception:
+            summaries[i] = _first_sentence_fallback(texts[i])
+
+    return summaries
+
+
+def _token_counts(texts: List[str]) -> List[int]:
+    """
+    BART token counts (with special tokens) for `texts`, for comparing
+    against BART_MAX_TOKENS. Byte-level BPE never yields more tokens than
+    UTF-8 bytes, so short texts get that upper bound without tokenizing;
+    the rest go through one batched fast-tokenizer call returning lengths.
+    """
+    counts = [len(text.encode("utf-8")) + 2 for text in texts]
+    long_idx = [i for i, n in enumerate(counts) if n > BART_MAX_TOKENS]
+    if long_idx:
+        lengths = get_bart_tokenizer()(
+            [texts[i] for i in long_idx],
+            return_length=True,
+            return_attention_mask=False
+        )["length"]
+        for i, n in zip(long_idx, lengths):
+            counts[i] = int(n)
+    return counts
+
+
+def _bart_summarize(texts: List[str], max_length: int, truncation: bool = False) -> List[str]:
+    """
+    Run BART on `texts` (min_length = max_length // 4), serving repeats from
+    the summary cache and batching the misses into one pipeline call.
+    Misses are length-sorted so each padded batch holds similar lengths.
+    Errors propagate, so failed generations are never cached.
+    """
+    keys = [(hashlib.blake2b(t.encode("utf-8"), digest_size=16).digest(), max_length) for t in texts]
+    summaries: Dict[Tuple[bytes, int], str] = {}
+    missing: Dict[Tuple[bytes, int], str] = {}
+
+    with _summary_cache_lock:
+        for key, text in zip(keys, texts):
+            if key in _summary_cache:
+                _summary_cache.move_to_end(key)
+                summaries[key] = _summary_cache[key]
+            else:
+                missing[key] = text
+
+    if missing:
+        import torch
+
+        kwargs = {"truncation": True} if truncation else {}
+        missing_keys = sorted(missing, key=lambda key: len(missing[key]))
+        # inference_mode: no autograd recording, view tracking or version counters
+        with _generation_lock, torch.inference_mode():
+            outputs = get_abstractive_summarizer()(
+                [missing[key] for key in missing_keys],
+                max_length=max_length,
+                min_length=max_length // 4,
+                do_sample=False,
+                batch_size=SUMMARY_BATCH_SIZE,
+                **kwargs
+            )
+        with _summary_cache_lock:
+            for key, output in zip(missing_keys, outputs):
+                summary = output["summary_text"].strip()
+                summaries[key] = summary
+                _summary_cache[key] = summary
+            while len(_summary_cache) > SUMMARY_CACHE_SIZE:
+                _summary_cache.popitem(last=False)
+
+    return [summaries[key] for key in keys]
+
+
 def _abstractive_single_pass(text: str, max_length: int) -> str:
     """Run abstractive summarization on a single chunk of text."""
-    return abstractive_summarizer(
-        text,
-        max_length=max_length,
-        min_length=max_length // 4,
-        do_sample=False
-    )[0]["summary_text"].strip()
+    return _bart_summarize([text], max_length)[0]
 
 
 def _abstractive_chunk(text: str) -> str:
     """Summarize one chunk, fallback to first sentences if fail."""
     try:
-        return abstractive_summarizer(
-            text,
-            max_length=128,
-            min_length=32,
-            do_sample=False
-        )[0]["summary_text"].strip()
+        return _bart_summarize([text], 128)[0]
     except Exception:
         return _first_sentence_fallback(text)
 
 
+def _abstractive_chunks(chunks: List[str]) -> List[str]:
+    """
+    Summarize all chunks in one batched call. If it fails, summarize them
+    one by one, each chunk with its own first-sentence fallback. This runs
+    sequentially: every pipeline call holds _generation_lock, so worker
+    threads would only queue behind each other.
+    """
+    try:
+        return _bart_summarize(chunks, 128)
+    except Exception:
+        return [_abstractive_chunk(chunk) for chunk in chunks]
+
+
 def _extract_key_sentences(text: str, num_sentences: int) -> List[str]:
     """
     Extract key sentences via TextRank using sentence-transformer embeddings.
     """
-    sentences = [s.strip() for s in re.split(r'[.!?]+', text) if len(s.strip()) > 10]
+    sentences, scores = _rank_sentences(text, num_sentences)
+    return _top_sentences(sentences, scores, num_sentences)
+
+
+def _extractive_short_and_long(text: str) -> Tuple[str, str]:
+    """
+    Short (3 sentences) and long (6 sentences) extractive summaries from a
+    single split/encode/TextRank pass over the document.
+    """
+    sentences, scores = _rank_sentences(text, 3)
+    return (
+        " ".join(_top_sentences(sentences, scores, 3)),
+        " ".join(_top_sentences(sentences, scores, 6))
+    )
+
+
+def _top_sentences(sentences: List[str], scores: Optional[np.ndarray], num_sentences: int) -> List[str]:
+    """The `num_sentences` best-ranked sentences, in document order."""
     if len(sentences) <= num_sentences:
         return sentences
+    if scores is None:
+        return sentences[:num_sentences]
+    top_idx = np.sort(np.argpartition(-scores, num_sentences)[:num_sentences])
+    return [sentences[i] for i in top_idx]
+
+
+def _rank_sentences(text: str, min_sentences: int) -> Tuple[List[str], Optional[np.ndarray]]:
+    """
+    Split `text` into sentences and TextRank them. Scores are None when there
+    are no more than `min_sentences` sentences (nothing to choose) or when
+    ranking failed.
+    """
+    sentences = [s.strip() for s in _SENTENCE_SPLIT_RE.split(text) if len(s.strip()) > 10]
+    if len(sentences) <= min_sentences:
+        return sentences, None
 
     try:
-        embeddings = sentence_model.encode(sentences, convert_to_numpy=True)
-        sim_matrix = cosine_similarity(embeddings)
-        np.fill_diagonal(sim_matrix, 0.0)  # Avoid self-loops
-        graph = nx.from_numpy_array(sim_matrix)
-        scores = nx.pagerank(graph)
-
-        ranked = sorted(scores.items(), key=lambda x: x[1], reverse=True)
-        top_idx = sorted([i for i, _ in ranked[:num_sentences]])
-        return [sentences[i] for i in top_idx]
+        import torch
+
+        # Normalized float32 embeddings: one SGEMM gives the cosine matrix
+        with torch.inference_mode():
+            embeddings = _get_sentence_embedding_cache().encode(sentences)
+        if len(sentences) >= KNN_GRAPH_MIN_SENTENCES:
+            # Long contracts: sparse top-k neighbour graph, never N x N
+            rows, cols, weights = _knn_similarity_edges(embeddings, KNN_NEIGHBORS)
+            scores = _pagerank_edges(rows, cols, weights, len(sentences))
+        else:
+            sim_matrix = embeddings @ embeddings.T
+            np.fill_diagonal(sim_matrix, 0.0)  # Avoid self-loops
+            scores = _pagerank(sim_matrix)
+        return sentences, scores
     except Exception as e:
         logging.warning(f"[Summarizer] Extractive fallback: {e}")
-        return sentences[:num_sentences]
+        return sentences, None
+
+
+def _pagerank(
+    weights: np.ndarray,
+    alpha: float = 0.85,
+    max_iter: int = 100,
+    tol: float = 1e-6
+) -> np.ndarray:
+    """
+    Weighted PageRank by power iteration on a dense adjacency matrix.
+    Same formulation as networkx.pagerank: rows are normalized by their
+    weight sum, dangling rows redistribute uniformly, and iteration stops
+    once the L1 change drops below n * tol.
+    """
+    n = weights.shape[0]
+    weights = weights.astype(np.float64, copy=False)
+    row_sums = weights.sum(axis=1)
+    dangling = row_sums == 0
+    transition = weights / np.where(dangling, 1.0, row_sums)[:, None]
+
+    rank = np.full(n, 1.0 / n)
+    for _ in range(max_iter):
+        previous = rank
+        rank = alpha * (previous @ transition + previous[dangling].sum() / n) + (1.0 - alpha) / n
+        if np.abs(rank - previous).sum() < n * tol:
+            break
+    return rank
+
+
+def _knn_similarity_edges(embeddings: np.ndarray, k: int, block_size: int = 256):
+    """
+    Edge list (rows, cols, weights) of the symmetrized k-nearest-neighbour
+    cosine graph, (S + S.T) / 2 where S keeps each sentence's top-k
+    neighbours (no self-loops). Similarities are computed a block of rows
+    at a time, so memory stays O(block_size * N).
+    """
+    n = embeddings.shape[0]
+    rows, cols, values = [], [], []
+    for start in range(0, n, block_size):
+        sims = embeddings[start:start + block_size] @ embeddings.T
+        block_rows = np.arange(start, start + sims.shape[0])
+        sims[np.arange(sims.shape[0]), block_rows] = -np.inf
+        neighbours = np.argpartition(-sims, k, axis=1)[:, :k]
+        rows.append(np.repeat(block_rows, k))
+        cols.append(neighbours.ravel())
+        values.append(np.take_along_axis(sims, neighbours, axis=1).ravel())
+
+    rows, cols, values = np.concatenate(rows), np.concatenate(cols), np.concatenate(values)
+    return (
+        np.concatenate([rows, cols]),
+        np.concatenate([cols, rows]),
+        np.concatenate([values, values]).astype(np.float64) / 2.0
+    )
+
+
+def _pagerank_edges(
+    rows: np.ndarray,
+    cols: np.ndarray,
+    weights: np.ndarray,
+    n: int,
+    alpha: float = 0.85,
+    max_iter: int = 100,
+    tol: float = 1e-6
+) -> np.ndarray:
+    """
+    `_pagerank` on a sparse graph given as an edge list (duplicate edges
+    add up); each iteration is one O(edges) scatter-add.
+    """
+    row_sums = np.bincount(rows, weights=weights, minlength=n)
+    dangling = row_sums == 0
+    transition = weights / np.where(dangling, 1.0, row_sums)[rows]
+
+    rank = np.full(n, 1.0 / n)
+    for _ in range(max_iter):
+        previous = rank
+        spread = np.bincount(cols, weights=previous[rows] * transition, minlength=n)
+        rank = alpha * (spread + previous[dangling].sum() / n) + (1.0 - alpha) / n
+        if np.abs(rank - previous).sum() < n * tol:
+            break
+    return rank
 
 
 def _first_sentence_fallback(text: str) -> str:
     """Get the first sentence or first 100 chars as fallback."""
-    sentences = re.split(r'[.!?]+', text)
+    sentences = _SENTENCE_SPLIT_RE.split(text)
     return sentences[0].strip() if sentences else text[:100]
 
 
@@ -4,15 +4,65 @@ Utility functions for document processing, clause-aware cleaning,
 and file operations for LawBrief AI.
 """
 
+import io
 import json
 import logging
 import os
 import re
-from typing import Any, List, Dict, Optional
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from typing import Any, BinaryIO, List, Dict, Optional, Union
 
 import pdfplumber
 from docx import Document
 
+try:
+    import orjson
+except ImportError:  # optional: falls back to the stdlib json module
+    orjson = None
+
+try:
+    import pymupdf
+except ImportError:  # optional: falls back to pdfplumber
+    pymupdf = None
+
+# Compiled once; these run on every document and every clause
+_NON_PRINTABLE_RE = re.compile(r"[^\x09\x0A\x0D\x20-\x7E]")
+_MULTI_NEWLINE_RE = re.compile(r"\n{3,}")
+_BULLET_RE = re.compile(r"[•·▪▫◦‣⁃]\s*")
+# Leading whitespace is bounded: on a long run of blank lines every line start
+# is a match attempt, and an unbounded `\s*` rescans the whole run from each
+_NUMBERING_RE = re.compile(
+    r"^\s{0,255}((?:\d+\.){1,3}|\d+\)|[A-Za-z]\))\s+", re.MULTILINE
+)
+_SPACES_RE = re.compile(r"[ \t]+")
+
+
+class _PrintableTable(dict):
+    """str.translate table: printable ASCII, tab, LF and CR map to themselves, anything else to a space."""
+
+    def __missing__(self, key: int) -> int:
+        return 0x20
+
+
+_PRINTABLE_TABLE = _PrintableTable({i: i for i in (0x09, 0x0A, 0x0D, *range(0x20, 0x7F))})
+
+# Longer inputs to clean_text are not memoized (whole documents rarely repeat)
+CLEAN_TEXT_CACHE_MAX_CHARS = 100_000
+
+# PDFs with at least this many pages are extracted in parallel worker processes,
+# each worker taking a contiguous range of at least PDF_MIN_PAGES_PER_WORKER pages
+PDF_PARALLEL_MIN_PAGES = 16
+PDF_MIN_PAGES_PER_WORKER = 8
+# Clause numbering only counts at the start of a line (after optional
+# indentation), so "(30) days", "$1,000. " or "under Section 4" mid-sentence
+# never start a clause
+_CLAUSE_RE = re.compile(
+    r"^[ \t]*(?P<numbering>(?:\d+\.){1,3}|\d+\)|[A-Z]\)|Section[ \t]+\d+)[ \t]+",
+    re.IGNORECASE | re.MULTILINE
+)
+
 
 def setup_logging(level: int = logging.INFO) -> None:
     """Configure logging for the application."""
@@ -30,9 +80,36 @@ def setup_logging(level: int = logging.INFO) -> None:
 # FILE LOADING
 # ----------------------------
 
-def load_pdf(path: str) -> Dict[str, Any]:
+# A file path, the raw file bytes, or a binary file-like object (e.g. an upload)
+DocumentSource = Union[str, bytes, BinaryIO]
+
+
+def _resolve_source(source: DocumentSource, kind: str) -> Union[str, bytes]:
+    """Return `source` as a path that exists or as in-memory bytes."""
+    if isinstance(source, str):
+        if not os.path.exists(source):
+            raise FileNotFoundError(f"{kind} file not found: {source}")
+        return source
+    if isinstance(source, (bytes, bytearray)):
+        return bytes(source)
+    return source.read()
+
+
+def _source_name(source: Union[str, bytes]) -> str:
+    return source if isinstance(source, str) else f"<{len(source)} bytes in memory>"
+
+
+def _open_source(source: Union[str, bytes]):
+    """Path or bytes -> something pdfplumber/python-docx can open."""
+    return source if isinstance(source, str) else io.BytesIO(source)
+
+
+def load_pdf(source: DocumentSource) -> Dict[str, Any]:
     """
-    Extract plain text and page-level mapping from a PDF file.
+    Extract plain text and page-level mapping from a PDF, given as a path,
+    raw bytes or a binary file-like object (parsed in memory, no temp file).
+    Paths are cached on (absolute path, mtime, size), so loading an unchanged
+    file again skips parsing.
 
     Returns:
         {
@@ -40,39 +117,107 @@ def load_pdf(path: str) -> Dict[str, Any]:
             "pages": [{"page_num": int, "text": str}]
         }
     """
-    if not os.path.exists(path):
-        raise FileNotFoundError(f"PDF file not found: {path}")
+    source = _resolve_source(source, "PDF")
 
+    if isinstance(source, str):
+        stat = os.stat(source)
+        cached = _load_pdf_path_cached(os.path.abspath(source), stat.st_mtime_ns, stat.st_size)
+        # Fresh containers, so a caller editing its result cannot alter the cache
+        return {
+            "full_text": cached["full_text"],
+            "pages": [dict(page) for page in cached["pages"]]
+        }
+    return _parse_pdf(source)
+
+
+@lru_cache(maxsize=8)
+def _load_pdf_path_cached(path: str, mtime_ns: int, size: int) -> Dict[str, Any]:
+    """Parse a PDF path; mtime and size are only part of the cache key."""
+    return _parse_pdf(path)
+
+
+def _parse_pdf(source: Union[str, bytes]) -> Dict[str, Any]:
+    """Text and pages of a PDF given as a path or bytes (see load_pdf)."""
     try:
         pages_data = []
         all_text = []
 
-        with pdfplumber.open(path) as pdf:
-            for i, page in enumerate(pdf.pages, start=1):
-                page_text = page.extract_text() or ""
-                cleaned = _remove_repetitive_headers_footers(page_text)
-                if cleaned.strip():
-                    pages_data.append({"page_num": i, "text": cleaned})
-                    all_text.append(cleaned)
+        if pymupdf is not None:
+            # MuPDF extracts text in C; fast enough not to need the process pool
+            page_texts = _extract_pdf_pages_pymupdf(source)
+        else:
+            with pdfplumber.open(_open_source(source)) as pdf:
+                num_pages = len(pdf.pages)
+                if num_pages < PDF_PARALLEL_MIN_PAGES:
+                    page_texts = [_clean_pdf_page(page) for page in pdf.pages]
+
+            if num_pages >= PDF_PARALLEL_MIN_PAGES:
+                page_texts = _extract_pdf_pages_parallel(source, num_pages)
+
+        for i, cleaned in enumerate(page_texts, start=1):
+            if cleaned.strip():
+                pages_data.append({"page_num": i, "text": cleaned})
+                all_text.append(cleaned)
 
         return {
             "full_text": "\n\n".join(all_text),
             "pages": pages_data
         }
     except Exception as e:
-        logging.error(f"Error loading PDF {path}: {str(e)}")
+        logging.error(f"Error loading PDF {_source_name(source)}: {str(e)}")
         raise Exception(f"Failed to parse PDF: {str(e)}")
 
 
-def load_docx(path: str) -> Dict[str, Any]:
+def _clean_pdf_page(page) -> str:
+    """Extract one pdfplumber page's text, minus repeated headers/footers."""
+    return _remove_repetitive_headers_footers(page.extract_text() or "")
+
+
+def _extract_pdf_pages_pymupdf(source: Union[str, bytes]) -> List[str]:
+    """Extract every page with PyMuPDF, minus repeated headers/footers, in page order."""
+    if isinstance(source, str):
+        doc = pymupdf.open(source)
+    else:
+        doc = pymupdf.open(stream=source, filetype="pdf")
+    with doc:
+        return [_remove_repetitive_headers_footers(page.get_text().rstrip()) for page in doc]
+
+
+def _extract_pdf_page_range(source: Union[str, bytes], start: int, stop: int) -> List[str]:
+    """Worker: open the PDF (path or bytes) and extract pages [start, stop)."""
+    with pdfplumber.open(_open_source(source)) as pdf:
+        return [_clean_pdf_page(pdf.pages[i]) for i in range(start, stop)]
+
+
+def _extract_pdf_pages_parallel(source: Union[str, bytes], num_pages: int) -> List[str]:
     """
-    Extract text from a DOCX file with paragraph-level mapping.
+    Extract all pages across worker processes, one contiguous page range
+    per worker (so each worker parses the file once), in page order.
+    Each worker re-parses the document structure, so ranges are kept large
+    enough for that start-up cost to pay off.
     """
-    if not os.path.exists(path):
-        raise FileNotFoundError(f"DOCX file not found: {path}")
+    workers = min(os.cpu_count() or 1, -(-num_pages // PDF_MIN_PAGES_PER_WORKER))
+    step = -(-num_pages // workers)
+    ranges = [(start, min(start + step, num_pages)) for start in range(0, num_pages, step)]
+
+    try:
+        with ProcessPoolExecutor(max_workers=len(ranges)) as executor:
+            futures = [executor.submit(_extract_pdf_page_range, source, start, stop) for start, stop in ranges]
+            return [text for future in futures for text in future.result()]
+    except Exception as e:
+        logging.warning(f"Parallel PDF extraction failed, extracting sequentially: {e}")
+        return _extract_pdf_page_range(source, 0, num_pages)
+
+
+def load_docx(source: DocumentSource) -> Dict[str, Any]:
+    """
+    Extract text from a DOCX (path, raw bytes or binary file-like object)
+    with paragraph-level mapping.
+    """
+    source = _resolve_source(source, "DOCX")
 
     try:
-        doc = Document(path)
+        doc = Document(_open_source(source))
         paragraphs = []
         numbered_paragraphs = []
 
@@ -87,7 +232,7 @@ def load_docx(path: str) -> Dict[str, Any]:
             "paragraphs": numbered_paragraphs
         }
     except Exception as e:
-        logging.error(f"Error loading DOCX {path}: {str(e)}")
+        logging.error(f"Error loading DOCX {_source_name(source)}: {str(e)}")
         raise Exception(f"Failed to parse DOCX: {str(e)}")
 
 
@@ -100,19 +245,14 @@ def _remove_repetitive_headers_footers(text: str) -> str:
     Remove likely headers/footers without killing legit repeated section titles.
     """
     lines = text.split("\n")
-    counts = {}
-    for line in lines:
-        stripped = line.strip()
-        if 6 <= len(stripped) <= 80:  # Skip very short/very long lines
-            counts[stripped] = counts.get(stripped, 0) + 1
+    stripped_lines = [line.strip() for line in lines]
+    # Skip very short/very long lines
+    counts = Counter(s for s in stripped_lines if 6 <= len(s) <= 80)
 
-    cleaned_lines = []
-    for line in lines:
-        stripped = line.strip()
-        if counts.get(stripped, 0) <= 5:  # Less aggressive threshold
-            cleaned_lines.append(line)
-
-    return "\n".join(cleaned_lines)
+    # Less aggressive threshold
+    return "\n".join(
+        line for line, stripped in zip(lines, stripped_lines) if counts[stripped] <= 5
+    )
 
 
 # def clean_text(text: str) -> str:
@@ -137,27 +277,41 @@ def _remove_repetitive_headers_footers(text: str) -> str:
 def clean_text(text: str) -> str:
     """
     Normalize whitespace & bullets, but preserve double newlines between clauses.
+    Results for clause-sized inputs are memoized (the function is pure).
     """
     if text is None:
         return ""
+    if len(text) > CLEAN_TEXT_CACHE_MAX_CHARS:
+        return _clean_text(text)
+    return _clean_text_cached(text)
 
-    text = re.sub(r"[^\x09\x0A\x0D\x20-\x7E]", " ", text)  # printable chars only
+
+def _clean_text(text: str) -> str:
+    # Printable chars only: a C-level translate for pure-ASCII text (its
+    # fast path), the regex otherwise
+    if text.isascii():
+        text = text.translate(_PRINTABLE_TABLE)
+    else:
+        text = _NON_PRINTABLE_RE.sub(" ", text)
 
     # Keep paragraph breaks intact
     text = text.replace("\r\n", "\n")
-    text = re.sub(r"\n{3,}", "\n\n", text)
 
-    # Normalize bullets & numbering
-    text = re.sub(r"[•·▪▫◦‣⁃]\s*", "• ", text)
-    text = re.sub(r"^\s*((?:\d+\.){1,3}|\d+\)|[A-Za-z]\))\s+",
-                  r"\1 ", text, flags=re.MULTILINE)
+    # Collapse excessive spaces within lines first: the substitutions below
+    # never create space runs, and they then scan far less whitespace
+    text = _SPACES_RE.sub(" ", text)
+    text = _MULTI_NEWLINE_RE.sub("\n\n", text)
 
-    # Collapse excessive spaces within lines
-    text = re.sub(r"[ \t]+", " ", text)
+    # Normalize bullets & numbering
+    text = _BULLET_RE.sub("• ", text)
+    text = _NUMBERING_RE.sub(r"\1 ", text)
 
     return text.strip()
 
 
+_clean_text_cached = lru_cache(maxsize=4096)(_clean_text)
+
+
 # ----------------------------
 # CLAUSE EXTRACTION
 # ----------------------------
@@ -168,36 +322,21 @@ def extract_clauses(text: str) -> List[Dict[str, Any]]:
     Returns list of {"id": int, "numbering": str, "text": str}.
     """
     clauses = []
-    clause_pattern = re.compile(
-        r"(?P<numbering>(?:\d+\.){1,3}|\d+\)|[A-Z]\)|Section\s+\d+)[ \t]+",
-        re.IGNORECASE
-    )
-
-    parts = clause_pattern.split(text)
-    temp_text = ""
-    clause_id = 1
-    numbering = None
-
-    for part in parts:
-        if clause_pattern.match(part):
-            if temp_text.strip():
-                clauses.append({
-                    "id": clause_id,
-                    "numbering": numbering,
-                    "text": temp_text.strip()
-                })
-                clause_id += 1
-                temp_text = ""
-            numbering = part.strip()
-        else:
-            temp_text += part
-
-    if temp_text.strip():
-        clauses.append({
-            "id": clause_id,
-            "numbering": numbering,
-            "text": temp_text.strip()
-        })
+    matches = list(_CLAUSE_RE.finditer(text))
+
+    # Each clause runs from the end of its numbering to the start of the
+    # next one; text before the first numbering has none
+    starts = [(None, 0)] + [(m.group("numbering").strip(), m.end()) for m in matches]
+    ends = [m.start() for m in matches] + [len(text)]
+
+    for (numbering, start), end in zip(starts, ends):
+        clause_text = text[start:end].strip()
+        if clause_text:
+            clauses.append({
+                "id": len(clauses) + 1,
+                "numbering": numbering,
+                "text": clause_text
+            })
 
     return clauses
 
@@ -212,22 +351,28 @@ def chunk_text(text: str, max_chars: int = 4000) -> List[str]:
     """
     clauses = extract_clauses(text)
     chunks = []
-    current_chunk = ""
+    # Current chunk as a list of clause texts plus its joined length, so
+    # growing it never copies the text accumulated so far
+    current_parts: List[str] = []
+    current_len = 0
 
     for clause in clauses:
         clause_text = clause["text"]
-        if len(current_chunk) + len(clause_text) + 2 > max_chars:
-            if current_chunk:
-                chunks.append(current_chunk.strip())
-                current_chunk = clause_text
+        if clause["numbering"]:
+            clause_text = f"{clause['numbering']} {clause_text}"
+        if current_len + len(clause_text) + 2 > max_chars:
+            if current_parts:
+                chunks.append("\n\n".join(current_parts).strip())
+                current_parts = [clause_text]
+                current_len = len(clause_text)
             else:
                 chunks.append(clause_text[:max_chars])
-                clause_text = clause_text[max_chars:]
         else:
-            current_chunk += ("\n\n" + clause_text) if current_chunk else clause_text
+            current_len += len(clause_text) + (2 if current_parts else 0)
+            current_parts.append(clause_text)
 
-    if current_chunk:
-        chunks.append(current_chunk.strip())
+    if current_parts:
+        chunks.append("\n\n".join(current_parts).strip())
 
     return chunks
 
@@ -240,6 +385,17 @@ def save_json(path: str, obj: Any) -> None:
     """Save an object to a JSON file."""
     try:
         os.makedirs(os.path.dirname(path), exist_ok=True)
+        if orjson is not None:
+            try:
+                data = orjson.dumps(
+                    obj, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+                )
+            except TypeError:
+                data = None  # e.g. integers beyond 64 bits: let json handle it
+            if data is not None:
+                with open(path, "wb") as f:
+                    f.write(data)
+                return
         with open(path, "w", encoding="utf-8") as f:
             json.dump(obj, f, indent=2, ensure_ascii=False)
     except Exception as e:
@@ -252,6 +408,9 @@ def load_json(path: str) -> Any:
     if not os.path.exists(path):
         raise FileNotFoundError(f"JSON file not found: {path}")
     try:
+        if orjson is not None:
+            with open(path, "rb") as f:
+                return orjson.loads(f.read())
         with open(path, "r", encoding="utf-8") as f:
             return json.load(f)
     except Exception as e:
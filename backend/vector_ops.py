@@ -0,0 +1,29 @@
+# File: backend/vector_ops.py
+"""
+Vectorized similarity kernels shared by the NLP backend modules.
+"""
+
+import numpy as np
+
+
+def l2_normalize(vectors: np.ndarray) -> np.ndarray:
+    """
+    L2-normalize the rows of a 2-D array (or a single 1-D vector).
+    Zero rows are left untouched instead of producing NaNs.
+    """
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+def cos_sim_matrix(A: np.ndarray, B: np.ndarray) -> np.ndarray:
+    """
+    Cosine similarity between every row of A (n, d) and every row of B (m, d).
+
+    Both inputs are normalized once and scored with a single BLAS matmul,
+    returning an (n, m) float32 matrix.
+    """
+    A = l2_normalize(np.atleast_2d(A))
+    B = l2_normalize(np.atleast_2d(B))
+    return A @ B.T
@@ -4,14 +4,24 @@ LawBrief AI - Main Streamlit Application
 A comprehensive legal document analyzer with offline-first capabilities.
 """
 
+import io
 import os
+import hashlib
 import logging
-import tempfile
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from typing import Dict, List, Optional
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
 
+import numpy as np
 import streamlit as st
-import pandas as pd
+
+try:
+    from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+except ImportError:  # older Streamlit: the worker runs without a script context
+    add_script_run_ctx = get_script_run_ctx = None
 
 # Backend imports
 
@@ -21,16 +31,18 @@ sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 # from backend.utils import load_pdf, load_docx, clean_text, setup_logging
 
 from backend.utils import load_pdf, load_docx, clean_text, setup_logging
-from backend.clause_extractor import extract_clauses
-from backend.risk_detector import assess_risks, get_risk_recommendations
-from backend.summarizer import summarize_document, generate_executive_summary
-from backend.report_generator import generate_pdf_report, generate_docx_report
+# clause_extractor, risk_detector, summarizer and report_generator pull in
+# spaCy/torch/transformers/reportlab; they are imported where first used
+# so the page renders before any of that loads
 
 # Frontend components
 from components.clause_table import render_clause_table
 from components.risk_chart import create_risk_chart
 from components.summary_card import render_summary_card
 
+# (percent complete, status message) reported between processing stages
+ProgressCallback = Callable[[int, str], None]
+
 # Setup logging
 setup_logging()
 logger = logging.getLogger(__name__)
@@ -84,8 +96,10 @@ def load_models():
     try:
         # Import here to trigger model loading
         from backend.clause_extractor import nlp, sentence_model
-        from backend.risk_detector import sentence_model as risk_model  
-        from backend.summarizer import abstractive_summarizer
+        from backend.risk_detector import get_sentence_model
+        get_sentence_model()
+        from backend.summarizer import get_abstractive_summarizer
+        get_abstractive_summarizer()
         return True
     except Exception as e:
         st.error(f"Error loading models: {e}")
@@ -252,67 +266,338 @@ def load_models():
 #             os.unlink(tmp_path)
 #         return {"success": False, "error": str(e)}
 
-@st.cache_data
-def process_document(file_content: bytes, filename: str) -> Dict:
+# Bump when the loaders change (invalidates parsed text) or when clause,
+# risk or summary logic changes (invalidates analyses, keeps parsed text)
+PARSER_VERSION = 1
+ANALYZER_VERSION = 1
+
+def process_document(
+    file_content: bytes,
+    filename: str,
+    progress_cb: Optional[ProgressCallback] = None
+) -> Dict:
+    """
+    Process an uploaded document, cached by the SHA-256 of its content.
+
+    Parsing and analysis are cached separately, so changes to the analysis
+    only re-run the analysis and never re-extract the PDF/DOCX text.
+    Cached results are shared between reruns and sessions (no copy per
+    hit), so callers must treat them as read-only. `progress_cb(percent,
+    message)` is called as each stage starts (not on cache hits).
+    """
     import logging
-    tmp_path = None
+
+    def report(percent: int, message: str) -> None:
+        if progress_cb is not None:
+            progress_cb(percent, message)
+
     try:
-        with tempfile.NamedTemporaryFile(delete=False, suffix=os.path.splitext(filename)[1]) as tmp_file:
-            tmp_file.write(file_content)
-            tmp_path = tmp_file.name
-        
-        if filename.lower().endswith('.pdf'):
-            pdf_data = load_pdf(tmp_path)
-            raw_text = pdf_data.get("full_text")
-        elif filename.lower().endswith('.docx'):
-            docx_data = load_docx(tmp_path)
-            raw_text = docx_data.get("full_text")
-        else:
-            raise ValueError("Unsupported file format")
-
-        logging.debug(f"Raw text type: {type(raw_text)}; length: {len(raw_text) if raw_text else 'None'}")
-
-        # Defensive: convert None to empty string before stripping
-        if raw_text is None:
-            raise ValueError("Extracted raw_text is None")
-        if not isinstance(raw_text, str):
-            raise ValueError(f"Extracted raw_text is not a string, but {type(raw_text)}")
-        if not raw_text.strip():
-            raise ValueError("Extracted raw_text is empty or whitespace only")
-
-        clean_text_content = clean_text(raw_text)
-
-        clauses = extract_clauses(clean_text_content)
-        risk_summary = assess_risks(clauses)
-        summaries = summarize_document(clean_text_content, mode="hybrid", clauses=clauses)
-
-        metadata = {
-            "filename": filename,
-            "file_size": f"{len(file_content) / 1024:.1f} KB",
-            "analysis_date": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-            "total_clauses": len(clauses),
-            "total_characters": len(clean_text_content)
-        }
-
-        if tmp_path and os.path.exists(tmp_path):
-            os.unlink(tmp_path)
-
-        return {
-            "success": True,
-            "metadata": metadata,
-            "raw_text": raw_text,
-            "clean_text": clean_text_content,
-            "clauses": clauses,
-            "risk_summary": risk_summary,
-            "summaries": summaries
-        }
+        content_key = hashlib.sha256(file_content).hexdigest()
+
+        report(20, "📄 Extracting text from document...")
+        raw_text = _parse_document(content_key, PARSER_VERSION, filename, file_content)
+
+        return _analyze_document(
+            content_key, ANALYZER_VERSION, filename, len(file_content), raw_text, progress_cb
+        )
 
     except Exception as e:
         logging.error(f"Document processing error: {e}", exc_info=True)
-        if tmp_path and os.path.exists(tmp_path):
-            os.unlink(tmp_path)
         return {"success": False, "error": str(e)}
 
+# Underscored arguments are excluded from Streamlit's argument hashing;
+# `content_key` already identifies the file content
+
+@st.cache_resource(max_entries=32, show_spinner=False)
+def _parse_document(content_key: str, parser_version: int, filename: str, _file_content: bytes) -> str:
+    """Extract and validate the raw text of an uploaded PDF/DOCX."""
+    import logging
+
+    # Parsed straight from the upload bytes, no temp file round-trip
+    if filename.lower().endswith('.pdf'):
+        pdf_data = load_pdf(_file_content)
+        raw_text = pdf_data.get("full_text")
+    elif filename.lower().endswith('.docx'):
+        docx_data = load_docx(_file_content)
+        raw_text = docx_data.get("full_text")
+    else:
+        raise ValueError("Unsupported file format")
+
+    logging.debug(f"Raw text type: {type(raw_text)}; length: {len(raw_text) if raw_text else 'None'}")
+
+    # Defensive: convert None to empty string before stripping
+    if raw_text is None:
+        raise ValueError("Extracted raw_text is None")
+    if not isinstance(raw_text, str):
+        raise ValueError(f"Extracted raw_text is not a string, but {type(raw_text)}")
+    if not raw_text.strip():
+        raise ValueError("Extracted raw_text is empty or whitespace only")
+
+    return raw_text
+
+@st.cache_resource(max_entries=32, show_spinner=False)
+def _analyze_document(
+    content_key: str,
+    analyzer_version: int,
+    filename: str,
+    file_size: int,
+    _raw_text: str,
+    _progress_cb: Optional[ProgressCallback] = None
+) -> Dict:
+    """Clean the parsed text, then extract clauses, assess risks and summarize."""
+    from backend.clause_extractor import extract_clauses, get_clause_embeddings
+    from backend.risk_detector import assess_risks
+    from backend.summarizer import summarize_document
+
+    raw_text = _raw_text
+
+    def report(percent: int, message: str) -> None:
+        if _progress_cb is not None:
+            _progress_cb(percent, message)
+
+    clean_text_content = clean_text(raw_text)
+
+    report(50, "🔍 Extracting clauses...")
+    clauses = extract_clauses(clean_text_content)
+    # Risk scoring uses the same encoder, so it reuses these (cache hits).
+    # No clauses (e.g. the cleaned text is empty): nothing to encode
+    clause_embeddings = get_clause_embeddings(clauses) if clauses else None
+
+    report(75, "⚠️ Assessing risks and 📝 generating summaries...")
+
+    # Risk scoring and summarization only read the clauses/text, so the
+    # risk encoder runs while BART generates (both release the GIL in torch)
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        risk_future = executor.submit(assess_risks, clauses, clause_embeddings)
+        summary_future = executor.submit(
+            summarize_document, clean_text_content, mode="hybrid", clauses=clauses
+        )
+        risk_summary = risk_future.result()
+        summaries = summary_future.result()
+
+    metadata = {
+        "filename": filename,
+        "file_size": f"{file_size / 1024:.1f} KB",
+        "analysis_date": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        "total_clauses": len(clauses),
+        "total_characters": len(clean_text_content)
+    }
+
+    return {
+        "success": True,
+        "metadata": metadata,
+        "raw_text": raw_text,
+        "clean_text": clean_text_content,
+        "clauses": clauses,
+        "risk_summary": risk_summary,
+        "summaries": summaries
+    }
+
+def run_with_progress(file_content: bytes, filename: str, progress_bar, status_text) -> Dict:
+    """
+    Run `process_document` on a background thread and relay its progress
+    events to the given widgets as they happen, so the page keeps updating
+    while the models work.
+
+    The worker carries this session's ScriptRunContext, so the cached
+    parse/analysis/model functions it calls behave as they do on the script
+    thread. If a rerun (any widget interaction) interrupts the run, the
+    script thread stops at its next widget update and drops the queue; the
+    daemon worker still finishes and fills the caches, so analyzing the same
+    file again reuses its result (Streamlit's per-key cache lock makes a
+    call made while the worker is still running wait for it) instead of
+    starting over.
+    """
+    events: "queue.Queue" = queue.Queue()
+    outcome: Dict = {}
+
+    def worker() -> None:
+        outcome["result"] = process_document(
+            file_content, filename, lambda percent, message: events.put((percent, message))
+        )
+
+    thread = threading.Thread(target=worker, daemon=True)
+    if add_script_run_ctx is not None:
+        add_script_run_ctx(thread, get_script_run_ctx())
+    thread.start()
+    while thread.is_alive() or not events.empty():
+        try:
+            percent, message = events.get(timeout=0.1)
+        except queue.Empty:
+            continue
+        status_text.text(message)
+        progress_bar.progress(percent)
+    thread.join()
+
+    return outcome.get("result") or {"success": False, "error": "Document processing did not complete"}
+
+@st.cache_data(max_entries=32, show_spinner=False)
+def _executive_summary(doc_hash: str, analyzer_version: int, _clauses: List[Dict], _risk_summary: Dict) -> str:
+    """Executive summary of an analyzed document, computed once per document."""
+    from backend.summarizer import generate_executive_summary
+
+    return generate_executive_summary(_clauses, _risk_summary)
+
+# Each tab body is a fragment: a widget inside one tab (e.g. the report
+# buttons) reruns only that tab, not main() and every other tab
+_fragment = getattr(st, "fragment", None) or getattr(st, "experimental_fragment", None) or (lambda f: f)
+
+@_fragment
+def _render_summary_tab(result: Dict) -> None:
+    """Executive summary card and key findings."""
+    st.markdown("### Executive Summary")
+    render_summary_card(result["summaries"], result["risk_summary"])
+    
+    # Key findings
+    st.markdown("### Key Findings")
+    exec_summary = _executive_summary(
+        st.session_state.doc_hash, ANALYZER_VERSION, result["clauses"], result["risk_summary"]
+    )
+    st.info(exec_summary)
+
+@_fragment
+def _render_risk_tab(result: Dict, clauses_by_id: Dict[int, Dict]) -> None:
+    """Risk metrics, recommendations and the top risky clauses."""
+    from backend.risk_detector import get_risk_recommendations
+
+    st.markdown("### Risk Assessment Overview")
+    
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        st.metric(
+            "Overall Risk Level",
+            result["risk_summary"]["contract_risk_level"],
+            delta=f"Score: {result['risk_summary']['contract_risk_score']:.3f}"
+        )
+    with col2:
+        st.metric("High Risk Clauses", result["risk_summary"]["high_risk_count"])
+    with col3:
+        st.metric("Medium Risk Clauses", result["risk_summary"]["medium_risk_count"])
+    
+    # Risk recommendations
+    st.markdown("### Risk Recommendations")
+    recommendations = get_risk_recommendations(result["risk_summary"])
+    for i, rec in enumerate(recommendations, 1):
+        st.warning(f"**{i}.** {rec}")
+    
+    # Top risky clauses
+    st.markdown("### Top Risk Clauses")
+    top_risky = result["risk_summary"]["top_risky_clauses"][:5]
+    
+    for clause_risk in top_risky:
+        clause = clauses_by_id[clause_risk["clause_id"]]
+        
+        with st.expander(
+            f"🚨 Clause {clause['id']}: {clause['type']} - {clause_risk['risk_level']} Risk"
+        ):
+            st.markdown(f"**Risk Score:** {clause_risk['risk_score']:.3f}")
+            if clause_risk["matched_terms"]:
+                st.markdown(f"**Concerning Terms:** {', '.join(clause_risk['matched_terms'])}")
+            st.markdown(f"**Text:** {clause['text']}")
+
+@_fragment
+def _render_clauses_tab(result: Dict) -> None:
+    """Table of every extracted clause with its risk."""
+    st.markdown("### Contract Clauses")
+    render_clause_table(result["clauses"], result["risk_summary"]["clause_risks"])
+
+@_fragment
+def _render_charts_tab(result: Dict, risk_by_id: Dict[int, Dict]) -> None:
+    """Risk distribution chart and per-clause risk scores."""
+    st.markdown("### Risk Visualization")
+    
+    # Risk distribution chart
+    chart_png = create_risk_chart(result["risk_summary"])
+    if chart_png:
+        st.image(chart_png)
+    
+    # Risk scores by clause
+    st.markdown("### Risk Scores by Clause")
+    # Plain arrays for the one plotted column, no DataFrame round-trip
+    clauses = result["clauses"]
+    clause_ids = np.fromiter((c["id"] for c in clauses), dtype=np.int32, count=len(clauses))
+    scores = np.fromiter(
+        (risk_by_id[c["id"]]["risk_score"] if c["id"] in risk_by_id else 0.0 for c in clauses),
+        dtype=np.float32,
+        count=len(clauses)
+    )
+    st.bar_chart({"Clause ID": clause_ids, "Risk Score": scores}, x="Clause ID", y="Risk Score")
+
+@_fragment
+def _render_reports_tab(result: Dict) -> None:
+    """PDF/DOCX report generation and download."""
+    from backend.report_generator import generate_pdf_report, generate_docx_report
+
+    st.markdown("### Download Reports")
+    
+    # Generated bytes persist in session_state per (format, document), so
+    # the download button survives reruns and repeat downloads cost nothing;
+    # only the current document's reports are kept
+    doc_hash = st.session_state.doc_hash
+    reports = {
+        key: data for key, data in st.session_state.get("report_bytes", {}).items()
+        if key[1] == doc_hash
+    }
+    st.session_state.report_bytes = reports
+    file_stem = Path(st.session_state.uploaded_filename).stem
+    
+    col1, col2 = st.columns(2)
+    
+    with col1:
+        pdf_key = ("pdf", doc_hash)
+        if st.button("📑 Generate PDF Report") and pdf_key not in reports:
+            with st.spinner("Generating PDF report..."):
+                try:
+                    # Rendered into memory, no temp file round-trip
+                    pdf_buffer = io.BytesIO()
+                    generate_pdf_report(
+                        pdf_buffer,
+                        result["metadata"],
+                        result["clauses"],
+                        result["risk_summary"],
+                        result["summaries"]
+                    )
+                    reports[pdf_key] = pdf_buffer.getvalue()
+                    st.success("✅ PDF report ready for download!")
+                    
+                except Exception as e:
+                    st.error(f"❌ PDF generation failed: {e}")
+        
+        if pdf_key in reports:
+            st.download_button(
+                label="📥 Download PDF Report",
+                data=reports[pdf_key],
+                file_name=f"lawbrief_report_{file_stem}.pdf",
+                mime="application/pdf"
+            )
+    
+    with col2:
+        docx_key = ("docx", doc_hash)
+        if st.button("📄 Generate DOCX Report") and docx_key not in reports:
+            with st.spinner("Generating DOCX report..."):
+                try:
+                    docx_buffer = io.BytesIO()
+                    generate_docx_report(
+                        docx_buffer,
+                        result["metadata"],
+                        result["clauses"],
+                        result["risk_summary"],
+                        result["summaries"]
+                    )
+                    reports[docx_key] = docx_buffer.getvalue()
+                    st.success("✅ DOCX report ready for download!")
+                    
+                except Exception as e:
+                    st.error(f"❌ DOCX generation failed: {e}")
+        
+        if docx_key in reports:
+            st.download_button(
+                label="📥 Download DOCX Report",
+                data=reports[docx_key],
+                file_name=f"lawbrief_report_{file_stem}.docx",
+                mime="application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+            )
+
 def main():
     """Main application function."""
     
@@ -384,32 +669,24 @@ def main():
                     progress_bar = st.progress(0)
                     status_text = st.empty()
                     
-                    # Update progress
-                    status_text.text("📄 Extracting text from document...")
-                    progress_bar.progress(20)
-                    
-                    # Process document
-                    result = process_document(uploaded_file.getvalue(), uploaded_file.name)
+                    # Process document; progress reflects the stages as they run
+                    result = run_with_progress(
+                        uploaded_file.getvalue(), uploaded_file.name, progress_bar, status_text
+                    )
                     
                     if not result["success"]:
                         st.error(f"❌ **Analysis failed:** {result['error']}")
                         st.stop()
                     
-                    status_text.text("🔍 Extracting clauses...")
-                    progress_bar.progress(50)
-                    
-                    status_text.text("⚠️ Assessing risks...")
-                    progress_bar.progress(75)
-                    
-                    status_text.text("📝 Generating summaries...")
-                    progress_bar.progress(90)
-                    
                     status_text.text("✅ Analysis complete!")
                     progress_bar.progress(100)
                     
                     # Store results in session state
                     st.session_state.analysis_result = result
                     st.session_state.uploaded_filename = uploaded_file.name
+                    st.session_state.doc_hash = hashlib.sha256(uploaded_file.getvalue()).hexdigest()
+                    # Reports of the previous document are no longer reachable
+                    st.session_state.report_bytes = {}
                 
                 # Clear progress indicators
                 progress_bar.empty()
@@ -436,6 +713,9 @@ def main():
     # Results section
     if "analysis_result" in st.session_state:
         result = st.session_state.analysis_result
+        # id -> clause / clause risk, built once instead of a scan per lookup
+        clauses_by_id = {c["id"]: c for c in result["clauses"]}
+        risk_by_id = {r["clause_id"]: r for r in result["risk_summary"]["clause_risks"]}
         
         st.markdown("---")
         st.markdown("## 📋 Analysis Results")
@@ -444,138 +724,19 @@ def main():
         tab1, tab2, tab3, tab4, tab5 = st.tabs(["📝 Summary", "⚠️ Risk Analysis", "📄 Clauses", "📊 Charts", "📑 Reports"])
         
         with tab1:
-            st.markdown("### Executive Summary")
-            render_summary_card(result["summaries"], result["risk_summary"])
-            
-            # Key findings
-            st.markdown("### Key Findings")
-            exec_summary = generate_executive_summary(result["clauses"], result["risk_summary"])
-            st.info(exec_summary)
-            
+            _render_summary_tab(result)
+        
         with tab2:
-            st.markdown("### Risk Assessment Overview")
-            
-            col1, col2, col3 = st.columns(3)
-            with col1:
-                st.metric(
-                    "Overall Risk Level",
-                    result["risk_summary"]["contract_risk_level"],
-                    delta=f"Score: {result['risk_summary']['contract_risk_score']:.3f}"
-                )
-            with col2:
-                st.metric("High Risk Clauses", result["risk_summary"]["high_risk_count"])
-            with col3:
-                st.metric("Medium Risk Clauses", result["risk_summary"]["medium_risk_count"])
-            
-            # Risk recommendations
-            st.markdown("### Risk Recommendations")
-            recommendations = get_risk_recommendations(result["risk_summary"])
-            for i, rec in enumerate(recommendations, 1):
-                st.warning(f"**{i}.** {rec}")
-            
-            # Top risky clauses
-            st.markdown("### Top Risk Clauses")
-            top_risky = result["risk_summary"]["top_risky_clauses"][:5]
-            
-            for clause_risk in top_risky:
-                clause = next(c for c in result["clauses"] if c["id"] == clause_risk["clause_id"])
-                
-                with st.expander(
-                    f"🚨 Clause {clause['id']}: {clause['type']} - {clause_risk['risk_level']} Risk"
-                ):
-                    st.markdown(f"**Risk Score:** {clause_risk['risk_score']:.3f}")
-                    if clause_risk["matched_terms"]:
-                        st.markdown(f"**Concerning Terms:** {', '.join(clause_risk['matched_terms'])}")
-                    st.markdown(f"**Text:** {clause['text']}")
+            _render_risk_tab(result, clauses_by_id)
         
         with tab3:
-            st.markdown("### Contract Clauses")
-            render_clause_table(result["clauses"], result["risk_summary"]["clause_risks"])
+            _render_clauses_tab(result)
         
         with tab4:
-            st.markdown("### Risk Visualization")
-            
-            # Risk distribution chart
-            fig = create_risk_chart(result["risk_summary"])
-            if fig:
-                st.pyplot(fig)
-            
-            # Risk scores by clause
-            st.markdown("### Risk Scores by Clause")
-            clause_data = []
-            for clause in result["clauses"]:
-                clause_risk = next(
-                    (r for r in result["risk_summary"]["clause_risks"] if r["clause_id"] == clause["id"]),
-                    {"risk_score": 0, "risk_level": "Unknown"}
-                )
-                clause_data.append({
-                    "Clause ID": clause["id"],
-                    "Type": clause["type"], 
-                    "Risk Score": clause_risk["risk_score"],
-                    "Risk Level": clause_risk["risk_level"]
-                })
-            
-            df = pd.DataFrame(clause_data)
-            st.bar_chart(data=df.set_index("Clause ID")["Risk Score"])
+            _render_charts_tab(result, risk_by_id)
         
         with tab5:
-            st.markdown("### Download Reports")
-            
-            col1, col2 = st.columns(2)
-            
-            with col1:
-                if st.button("📑 Generate PDF Report"):
-                    with st.spinner("Generating PDF report..."):
-                        try:
-                            pdf_path = f"temp_report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf"
-                            generate_pdf_report(
-                                pdf_path,
-                                result["metadata"],
-                                result["clauses"],
-                                result["risk_summary"],
-                                result["summaries"]
-                            )
-                            
-                            with open(pdf_path, "rb") as f:
-                                st.download_button(
-                                    label="📥 Download PDF Report",
-                                    data=f.read(),
-                                    file_name=f"lawbrief_report_{st.session_state.uploaded_filename.split('.')[0]}.pdf",
-                                    mime="application/pdf"
-                                )
-                            
-                            os.unlink(pdf_path)
-                            st.success("✅ PDF report ready for download!")
-                            
-                        except Exception as e:
-                            st.error(f"❌ PDF generation failed: {e}")
-            
-            with col2:
-                if st.button("📄 Generate DOCX Report"):
-                    with st.spinner("Generating DOCX report..."):
-                        try:
-                            docx_path = f"temp_report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.docx"
-                            generate_docx_report(
-                                docx_path,
-                                result["metadata"],
-                                result["clauses"],
-                                result["risk_summary"],
-                                result["summaries"]
-                            )
-                            
-                            with open(docx_path, "rb") as f:
-                                st.download_button(
-                                    label="📥 Download DOCX Report",
-                                    data=f.read(),
-                                    file_name=f"lawbrief_report_{st.session_state.uploaded_filename.split('.')[0]}.docx",
-                                    mime="application/vnd.openxmlformats-officedocument.wordprocessingml.document"
-                                )
-                            
-                            os.unlink(docx_path)
-                            st.success("✅ DOCX report ready for download!")
-                            
-                        except Exception as e:
-                            st.error(f"❌ DOCX generation failed: {e}")
+            _render_reports_tab(result)
     
     # Footer
     st.markdown("---")
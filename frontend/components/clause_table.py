@@ -4,8 +4,100 @@ Interactive clause table component for displaying contract clauses.
 """
 
 import streamlit as st
+import numpy as np
 import pandas as pd
-from typing import Dict, List
+from typing import Dict, FrozenSet, List, Set, Tuple
+
+PREVIEW_CHARS = 100
+
+# Columns kept in the table frame for the detail pane but not displayed
+DETAIL_ONLY_COLUMNS = ("Full Text", "Character Count", "Word Count")
+
+# Above this many rows the table is shown without row colours: Styler
+# renders every cell in Python, which dominates for very long contracts
+STYLED_ROW_LIMIT = 500
+
+_fragment = getattr(st, "fragment", None) or getattr(st, "experimental_fragment", None) or (lambda f: f)
+
+# Row background per risk level (unknown levels stay unstyled)
+RISK_LEVEL_STYLES = {
+    "High": "background-color: #ffebee",
+    "Medium": "background-color: #fff3e0",
+    "Low": "background-color: #e8f5e8"
+}
+
+# Marker shown next to a clause heading per risk level
+RISK_LEVEL_EMOJI = {
+    "High": "🔴",
+    "Medium": "🟡",
+    "Low": "🟢"
+}
+
+def _risk_row_styles(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    CSS for the whole frame in one call (Styler.apply with axis=None): each
+    row's risk-level colour, broadcast across its columns.
+    """
+    levels = df["Risk Level"]
+    row_css = np.select(
+        [levels.eq(level).to_numpy() for level in RISK_LEVEL_STYLES],
+        list(RISK_LEVEL_STYLES.values()),
+        default=""
+    )
+    return pd.DataFrame(
+        np.broadcast_to(row_css[:, None], df.shape), index=df.index, columns=df.columns
+    )
+
+def _format_entities(entities) -> str:
+    """First three entities as "text (LABEL)", plus a count of the rest."""
+    if not isinstance(entities, list) or not entities:
+        return ""
+    text = ", ".join(f"{ent['text']} ({ent['label']})" for ent in entities[:3])
+    if len(entities) > 3:
+        text += f" +{len(entities) - 3} more"
+    return text
+
+@st.cache_data(max_entries=32, show_spinner=False)
+def _build_table_df(
+    clauses: List[Dict], clause_risks: List[Dict]
+) -> Tuple[pd.DataFrame, Dict[str, Set[int]]]:
+    """
+    Clause table built column by column: clauses left-joined with their risk
+    (by clause id), then each display column derived in one vectorized step.
+    Also returns the clause ids per displayed risk level, for filtering.
+    Cached on the content of its inputs, so reruns (filters, row selection,
+    buttons) skip the rebuild.
+    """
+    clauses_df = pd.DataFrame(clauses)
+    # Last entry wins for a repeated clause_id, as with a dict lookup
+    risks_df = (
+        pd.DataFrame(clause_risks, columns=["clause_id", "risk_level", "risk_score"])
+        .drop_duplicates("clause_id", keep="last")
+        .set_index("clause_id")
+    )
+    risks = clauses_df[["id"]].join(risks_df, on="id")
+
+    texts = clauses_df["text"]
+    if "entities" in clauses_df:
+        entities = clauses_df["entities"].map(_format_entities)
+    else:
+        entities = pd.Series("", index=clauses_df.index)
+
+    df = pd.DataFrame({
+        "ID": clauses_df["id"],
+        "Type": clauses_df["type"],
+        "Risk Level": risks["risk_level"].fillna("Unknown"),
+        "Risk Score": risks["risk_score"].fillna(0).map("{:.3f}".format),
+        "Entities": entities,
+        "Preview": texts.str.slice(0, PREVIEW_CHARS) + np.where(texts.str.len() > PREVIEW_CHARS, "...", ""),
+        # Hidden columns, kept for the detail pane; words counted as
+        # whitespace-separated runs, as str.split() would
+        "Full Text": texts,
+        "Character Count": texts.str.len(),
+        "Word Count": texts.str.count(r"\S+")
+    })
+    ids_by_level = {level: set(ids) for level, ids in df.groupby("Risk Level")["ID"]}
+    return df, ids_by_level
 
 def render_clause_table(clauses: List[Dict], clause_risks: List[Dict]) -> None:
     """
@@ -19,133 +111,144 @@ def render_clause_table(clauses: List[Dict], clause_risks: List[Dict]) -> None:
         st.warning("No clauses found to display")
         return
     
-    # Create risk lookup dictionary
+    # Create risk lookup dictionary (clause details below)
     risk_lookup = {risk["clause_id"]: risk for risk in clause_risks}
     
-    # Prepare table data
-    table_data = []
-    for clause in clauses:
-        risk_info = risk_lookup.get(clause["id"], {})
-        
-        # Format entities
-        entities_text = ""
-        if clause.get("entities"):
-            entity_strs = [f"{ent['text']} ({ent['label']})" for ent in clause["entities"]]
-            entities_text = ", ".join(entity_strs[:3])
-            if len(clause["entities"]) > 3:
-                entities_text += f" +{len(clause['entities']) - 3} more"
-        
-        # Preview text (first 100 characters)
-        preview = clause["text"][:100] + "..." if len(clause["text"]) > 100 else clause["text"]
-        
-        table_data.append({
-            "ID": clause["id"],
-            "Type": clause["type"],
-            "Risk Level": risk_info.get("risk_level", "Unknown"),
-            "Risk Score": f"{risk_info.get('risk_score', 0):.3f}",
-            "Entities": entities_text,
-            "Preview": preview,
-            "Full Text": clause["text"]  # Hidden column for expandable view
-        })
-    
     # Create DataFrame
-    df = pd.DataFrame(table_data)
+    df, ids_by_level = _build_table_df(clauses, clause_risks)
+    
+    _render_clause_browser(clauses, risk_lookup, df, ids_by_level)
+
+@_fragment
+def _render_clause_browser(
+    clauses: List[Dict],
+    risk_lookup: Dict[int, Dict],
+    df: pd.DataFrame,
+    ids_by_level: Dict[str, Set[int]]
+) -> None:
+    """
+    Risk-level filter, selectable clause table and one detail pane for the
+    selected row. A fragment: filtering, selecting a row or pressing the copy
+    button reruns only this block.
+    """
+    # Risk level filter
+    risk_levels = ["All"] + sorted(ids_by_level)
+    selected_risk = st.selectbox("Filter by Risk Level:", risk_levels, key="clause_risk_filter")
+    
+    # Filter rows based on selection
+    if selected_risk != "All":
+        df = df[df["ID"].isin(ids_by_level.get(selected_risk, set()))]
     
     # Display table with selection
-    st.markdown("**Select clauses to view details:**")
-    
-    # Color code risk levels
-    def highlight_risk(row):
-        if row['Risk Level'] == 'High':
-            return ['background-color: #ffebee'] * len(row)
-        elif row['Risk Level'] == 'Medium':
-            return ['background-color: #fff3e0'] * len(row)
-        elif row['Risk Level'] == 'Low':
-            return ['background-color: #e8f5e8'] * len(row)
-        else:
-            return [''] * len(row)
-    
-    # Display styled dataframe (excluding Full Text column)
-    display_df = df.drop('Full Text', axis=1)
-    styled_df = display_df.style.apply(highlight_risk, axis=1)
-    
-    st.dataframe(
-        styled_df,
+    st.markdown("**Select a clause to view details:**")
+    
+    # Color code risk levels, all rows in one vectorized pass
+    if len(df) <= STYLED_ROW_LIMIT:
+        table = df.style.apply(_risk_row_styles, axis=None)
+    else:
+        table = df
+        st.caption(f"Row colours are off for tables over {STYLED_ROW_LIMIT} clauses.")
+    
+    # Display dataframe (detail-only columns are left out of the column
+    # order rather than dropped into a copy). Keyed per filter: a row
+    # position is only meaningful for the rows it was selected in, so each
+    # filter keeps its own selection instead of inheriting another's.
+    event = st.dataframe(
+        table,
         use_container_width=True,
         hide_index=True,
-        height=400
+        height=400,
+        column_order=[column for column in df.columns if column not in DETAIL_ONLY_COLUMNS],
+        on_select="rerun",
+        selection_mode="single-row",
+        key=f"clause_tbl_{selected_risk}"
     )
     
-    # Expandable clause details
+    # Clause details for the selected row only
     st.markdown("---")
     st.markdown("**📖 Clause Details**")
     
-    # Risk level filter
-    risk_levels = ["All"] + sorted(df["Risk Level"].unique().tolist())
-    selected_risk = st.selectbox("Filter by Risk Level:", risk_levels)
+    selected_rows = [row for row in event.selection.rows if row < len(df)]  # defensive bound
+    if not selected_rows:
+        st.caption("Select a row in the table above to see the full clause.")
+        return
     
-    # Filter clauses based on selection
-    filtered_clauses = clauses
-    if selected_risk != "All":
-        filtered_clause_ids = df[df["Risk Level"] == selected_risk]["ID"].tolist()
-        filtered_clauses = [c for c in clauses if c["id"] in filtered_clause_ids]
+    row = df.iloc[selected_rows[0]]
+    clause = clauses[row.name]
+    _render_clause_detail(
+        clause,
+        risk_lookup.get(clause["id"], {}),
+        int(row["Character Count"]),
+        int(row["Word Count"])
+    )
+
+def _render_clause_detail(clause: Dict, risk_info: Dict, char_count: int, word_count: int) -> None:
+    """
+    Full text, risk metric, terms, entities and metadata for one clause.
+    Character and word counts come precomputed from the cached table.
+    """
+    # Risk level emoji
+    risk_emoji = RISK_LEVEL_EMOJI.get(risk_info.get("risk_level", "Unknown"), "⚪")
+    
+    st.markdown(
+        f"{risk_emoji} **Clause {clause['id']}: {clause['type']}** "
+        f"(Risk: {risk_info.get('risk_level', 'Unknown')})"
+    )
+    
+    col1, col2 = st.columns([2, 1])
     
-    # Display detailed clause information
-    for clause in filtered_clauses:
-        risk_info = risk_lookup.get(clause["id"], {})
+    with col1:
+        st.markdown("**Clause Text:**")
+        st.write(clause["text"])
         
-        # Risk level emoji
-        risk_emoji = {
-            "High": "🔴",
-            "Medium": "🟡", 
-            "Low": "🟢"
-        }.get(risk_info.get("risk_level", "Unknown"), "⚪")
+        # Copy button for clause text
+        if st.button(f"📋 Copy Text", key=f"copy_{clause['id']}"):
+            st.code(clause["text"], language=None)
+            st.success("Text ready to copy from code block above!")
+    
+    with col2:
+        st.markdown("**Details:**")
         
-        with st.expander(
-            f"{risk_emoji} **Clause {clause['id']}: {clause['type']}** "
-            f"(Risk: {risk_info.get('risk_level', 'Unknown')})"
-        ):
-            col1, col2 = st.columns([2, 1])
-            
-            with col1:
-                st.markdown("**Clause Text:**")
-                st.write(clause["text"])
-                
-                # Copy button for clause text
-                if st.button(f"📋 Copy Text", key=f"copy_{clause['id']}"):
-                    st.code(clause["text"], language=None)
-                    st.success("Text ready to copy from code block above!")
+        # Risk information
+        if risk_info:
+            st.metric(
+                "Risk Score",
+                f"{risk_info.get('risk_score', 0):.3f}",
+                delta=risk_info.get('risk_level', 'Unknown')
+            )
             
-            with col2:
-                st.markdown("**Details:**")
-                
-                # Risk information
-                if risk_info:
-                    st.metric(
-                        "Risk Score",
-                        f"{risk_info.get('risk_score', 0):.3f}",
-                        delta=risk_info.get('risk_level', 'Unknown')
-                    )
-                    
-                    if risk_info.get("matched_terms"):
-                        st.markdown("**Concerning Terms:**")
-                        for term in risk_info["matched_terms"]:
-                            st.markdown(f"- `{term}`")
-                
-                # Entities
-                if clause.get("entities"):
-                    st.markdown("**Entities Found:**")
-                    for entity in clause["entities"]:
-                        st.markdown(f"- **{entity['text']}** ({entity['label']})")
-                
-                # Clause metadata
-                st.markdown("**Metadata:**")
-                st.json({
-                    "Clause ID": clause["id"],
-                    "Type": clause["type"],
-                    "Character Count": len(clause["text"]),
-                    "Word Count": len(clause["text"].split())
-                })
+            if risk_info.get("matched_terms"):
+                # One markdown element per list rather than one per item
+                st.markdown("**Concerning Terms:**")
+                st.markdown("\n".join(f"- `{term}`" for term in risk_info["matched_terms"]))
+        
+        # Entities
+        if clause.get("entities"):
+            st.markdown("**Entities Found:**")
+            st.markdown("\n".join(
+                f"- **{entity['text']}** ({entity['label']})" for entity in clause["entities"]
+            ))
+        
+        # Clause metadata
+        st.markdown("**Metadata:**")
+        st.json({
+            "Clause ID": clause["id"],
+            "Type": clause["type"],
+            "Character Count": char_count,
+            "Word Count": word_count
+        })
+
+@st.cache_data(max_entries=32, show_spinner=False)
+def _clause_search_index(clauses: List[Dict]) -> List[Tuple[str, str, FrozenSet[str]]]:
+    """Per clause: lowercased text, type and entity labels, computed once per clause list."""
+    return [
+        (
+            clause["text"].lower(),
+            clause["type"],
+            frozenset(entity["label"] for entity in clause.get("entities", []))
+        )
+        for clause in clauses
+    ]
 
 def render_clause_search(clauses: List[Dict]) -> List[Dict]:
     """
@@ -165,46 +268,30 @@ def render_clause_search(clauses: List[Dict]) -> List[Dict]:
         placeholder="Enter keywords to search..."
     )
     
+    index = _clause_search_index(clauses)
+    
     # Filter options
     col1, col2 = st.columns(2)
     
     with col1:
-        clause_types = ["All Types"] + sorted(set(clause["type"] for clause in clauses))
+        clause_types = ["All Types"] + sorted({clause_type for _, clause_type, _ in index})
         selected_type = st.selectbox("Filter by Type:", clause_types)
     
     with col2:
         # Entity filter
-        all_entities = set()
-        for clause in clauses:
-            for entity in clause.get("entities", []):
-                all_entities.add(entity["label"])
-        
+        all_entities = set().union(*(labels for _, _, labels in index))
         entity_labels = ["All Entities"] + sorted(all_entities)
         selected_entity = st.selectbox("Filter by Entity Type:", entity_labels)
     
-    # Apply filters
-    filtered_clauses = clauses
-    
-    # Text search
-    if search_term:
-        filtered_clauses = [
-            clause for clause in filtered_clauses
-            if search_term.lower() in clause["text"].lower()
-        ]
-    
-    # Type filter
-    if selected_type != "All Types":
-        filtered_clauses = [
-            clause for clause in filtered_clauses
-            if clause["type"] == selected_type
-        ]
-    
-    # Entity filter
-    if selected_entity != "All Entities":
-        filtered_clauses = [
-            clause for clause in filtered_clauses
-            if any(entity["label"] == selected_entity for entity in clause.get("entities", []))
-        ]
+    # Apply text, type and entity filters in a single pass
+    term = search_term.lower()
+    filtered_clauses = [
+        clause
+        for clause, (text_lc, clause_type, labels) in zip(clauses, index)
+        if (not term or term in text_lc)
+        and (selected_type == "All Types" or clause_type == selected_type)
+        and (selected_entity == "All Entities" or selected_entity in labels)
+    ]
     
     # Display results count
     if len(filtered_clauses) != len(clauses):
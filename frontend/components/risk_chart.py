@@ -3,12 +3,60 @@
 Risk visualization component for creating charts and graphs.
 """
 
+import io
+import matplotlib
+matplotlib.use("Agg")  # Figures are only rendered server-side for Streamlit
 import matplotlib.pyplot as plt
 import matplotlib.patches as patches
 from typing import Dict, List, Optional
+import altair as alt
 import numpy as np
+import pandas as pd
+import streamlit as st
 
-def create_risk_chart(risk_summary: Dict) -> Optional[plt.Figure]:
+# Charts are rasterised once per input content and cached as PNG bytes,
+# which pickle cheaply and let reruns skip matplotlib entirely
+_cache_chart = st.cache_data(max_entries=32, show_spinner=False)
+
+CHART_DPI = 96
+
+# Simplify long paths and lay figures out with fixed margins instead of
+# running the tight_layout solver on every chart
+plt.rcParams.update({
+    "path.simplify": True,
+    "path.simplify_threshold": 1.0,
+    "agg.path.chunksize": 10000,
+    "figure.autolayout": False,
+})
+
+def _figure_to_png(fig: plt.Figure) -> bytes:
+    """Render a figure to PNG bytes and release it."""
+    try:
+        buffer = io.BytesIO()
+        fig.savefig(buffer, format="png", dpi=CHART_DPI, bbox_inches="tight")
+        return buffer.getvalue()
+    finally:
+        plt.close(fig)
+
+def _clause_risk_frame(clauses: List[Dict], clause_risks: List[Dict]) -> pd.DataFrame:
+    """
+    One row per clause (id, type) joined with its risk by clause id: score 0
+    and level "Unknown" when unscored, last entry winning for a repeated id.
+    Shared by the per-clause charts instead of each building a risk lookup.
+    """
+    clauses_df = pd.DataFrame(clauses, columns=["id", "type"])
+    risks_df = (
+        pd.DataFrame(clause_risks, columns=["clause_id", "risk_score", "risk_level"])
+        .drop_duplicates("clause_id", keep="last")
+        .set_index("clause_id")
+    )
+    joined = clauses_df.join(risks_df, on="id")
+    joined["risk_score"] = joined["risk_score"].fillna(0).astype(float)
+    joined["risk_level"] = joined["risk_level"].fillna("Unknown")
+    return joined
+
+@_cache_chart
+def create_risk_chart(risk_summary: Dict) -> Optional[bytes]:
     """
     Create a risk distribution visualization.
     
@@ -16,7 +64,7 @@ def create_risk_chart(risk_summary: Dict) -> Optional[plt.Figure]:
         risk_summary: Risk assessment summary dictionary
         
     Returns:
-        Matplotlib figure object or None if no data
+        PNG image bytes or None if no data
     """
     try:
         risk_dist = risk_summary.get("risk_distribution", {})
@@ -55,7 +103,7 @@ def create_risk_chart(risk_summary: Dict) -> Optional[plt.Figure]:
         
         # Bar chart
         y_pos = np.arange(len(labels))
-        bars = ax2.barh(y_pos, sizes, color=chart_colors)
+        ax2.barh(y_pos, sizes, color=chart_colors)
         
         ax2.set_yticks(y_pos)
         ax2.set_yticklabels(labels)
@@ -63,20 +111,19 @@ def create_risk_chart(risk_summary: Dict) -> Optional[plt.Figure]:
         ax2.set_xlabel('Number of Clauses')
         ax2.set_title('Risk Levels by Count', fontsize=14, fontweight='bold', pad=20)
         
-        # Add value labels on bars
-        for i, (bar, size) in enumerate(zip(bars, sizes)):
-            width = bar.get_width()
-            ax2.text(width + 0.1, bar.get_y() + bar.get_height()/2, 
-                    str(size), ha='left', va='center', fontweight='bold')
+        # Add value labels on bars (bar ends and centres are known up front)
+        for size, x, y in zip(sizes, np.asarray(sizes) + 0.1, y_pos):
+            ax2.text(x, y, str(size), ha='left', va='center', fontweight='bold')
         
-        plt.tight_layout()
-        return fig
+        fig.subplots_adjust(left=0.05, right=0.95, top=0.85, bottom=0.1, wspace=0.3)
+        return _figure_to_png(fig)
         
     except Exception as e:
         print(f"Error creating risk chart: {e}")
         return None
 
-def create_risk_score_heatmap(clauses: List[Dict], clause_risks: List[Dict]) -> Optional[plt.Figure]:
+@_cache_chart
+def create_risk_score_heatmap(clauses: List[Dict], clause_risks: List[Dict]) -> Optional[bytes]:
     """
     Create a heatmap showing risk scores across clause types.
     
@@ -85,73 +132,52 @@ def create_risk_score_heatmap(clauses: List[Dict], clause_risks: List[Dict]) ->
         clause_risks: List of risk assessment dictionaries
         
     Returns:
-        Matplotlib figure object or None if insufficient data
+        PNG image bytes or None if insufficient data
     """
     try:
-        # Create risk lookup
-        risk_lookup = {risk["clause_id"]: risk for risk in clause_risks}
-        
-        # Group by clause type
-        type_risks = {}
-        for clause in clauses:
-            clause_type = clause["type"]
-            risk_info = risk_lookup.get(clause["id"], {})
-            risk_score = risk_info.get("risk_score", 0)
-            
-            if clause_type not in type_risks:
-                type_risks[clause_type] = []
-            type_risks[clause_type].append(risk_score)
-        
-        # Calculate average risk per type
-        avg_risks = {
-            clause_type: np.mean(scores) 
-            for clause_type, scores in type_risks.items()
-        }
-        
-        if not avg_risks:
+        if not clauses:
             return None
         
+        # Join each clause with its risk score (0 when unscored), then
+        # average per type in first-appearance order
+        clauses_df = _clause_risk_frame(clauses, clause_risks)
+        avg_risks = clauses_df.groupby("type", sort=False)["risk_score"].mean()
+        
         # Create horizontal bar chart
         fig, ax = plt.subplots(figsize=(10, max(6, len(avg_risks) * 0.8)))
         
-        types = list(avg_risks.keys())
-        scores = list(avg_risks.values())
+        types = avg_risks.index.tolist()
+        scores = avg_risks.to_numpy()
         
-        # Color based on risk level
-        colors = []
-        for score in scores:
-            if score < 0.25:
-                colors.append('#4CAF50')  # Green for low risk
-            elif score < 0.55:
-                colors.append('#FF9800')  # Orange for medium risk
-            else:
-                colors.append('#F44336')  # Red for high risk
+        # Color based on risk level: green low, orange medium, red high
+        colors = np.select(
+            [scores < 0.25, scores < 0.55], ['#4CAF50', '#FF9800'], default='#F44336'
+        ).tolist()
         
-        bars = ax.barh(types, scores, color=colors)
+        ax.barh(types, scores, color=colors)
         
         ax.set_xlabel('Average Risk Score')
         ax.set_title('Average Risk Score by Clause Type', fontsize=14, fontweight='bold')
         ax.set_xlim(0, 1.0)
         
-        # Add score labels
-        for bar, score in zip(bars, scores):
-            width = bar.get_width()
-            ax.text(width + 0.02, bar.get_y() + bar.get_height()/2,
-                   f'{score:.3f}', ha='left', va='center', fontweight='bold')
+        # Add score labels (categorical bars sit at 0..n-1)
+        for score, x, y in zip(scores, scores + 0.02, range(len(scores))):
+            ax.text(x, y, f'{score:.3f}', ha='left', va='center', fontweight='bold')
         
         # Add risk level guidelines
         ax.axvline(x=0.25, color='gray', linestyle='--', alpha=0.7, label='Low-Medium Threshold')
         ax.axvline(x=0.55, color='gray', linestyle='--', alpha=0.7, label='Medium-High Threshold')
         ax.legend()
         
-        plt.tight_layout()
-        return fig
+        fig.subplots_adjust(left=0.25, right=0.95, top=0.92, bottom=0.08)
+        return _figure_to_png(fig)
         
     except Exception as e:
         print(f"Error creating risk heatmap: {e}")
         return None
 
-def create_risk_radar_chart(risk_summary: Dict) -> Optional[plt.Figure]:
+@_cache_chart
+def create_risk_radar_chart(risk_summary: Dict) -> Optional[bytes]:
     """
     Create a radar chart showing different risk dimensions.
     
@@ -159,7 +185,7 @@ def create_risk_radar_chart(risk_summary: Dict) -> Optional[plt.Figure]:
         risk_summary: Risk assessment summary
         
     Returns:
-        Matplotlib figure object or None if insufficient data
+        PNG image bytes or None if insufficient data
     """
     try:
         # Define risk dimensions based on available data
@@ -185,17 +211,18 @@ def create_risk_radar_chart(risk_summary: Dict) -> Optional[plt.Figure]:
         # Create radar chart
         fig, ax = plt.subplots(figsize=(8, 8), subplot_kw=dict(projection='polar'))
         
-        # Calculate angle for each dimension
-        angles = np.linspace(0, 2 * np.pi, len(dimensions), endpoint=False).tolist()
-        scores += [scores[0]]  # Complete the circle
-        angles += [angles]  # Complete the circle
+        # Calculate angle for each dimension, then repeat the first point
+        # to complete the circle
+        angles = np.linspace(0, 2 * np.pi, len(dimensions), endpoint=False)
+        closed_angles = np.concatenate([angles, angles[:1]])
+        closed_scores = np.concatenate([scores, scores[:1]])
         
         # Plot
-        ax.plot(angles, scores, 'o-', linewidth=2, label='Risk Profile', color='#FF5722')
-        ax.fill(angles, scores, alpha=0.25, color='#FF5722')
+        ax.plot(closed_angles, closed_scores, 'o-', linewidth=2, label='Risk Profile', color='#FF5722')
+        ax.fill(closed_angles, closed_scores, alpha=0.25, color='#FF5722')
         
         # Add labels
-        ax.set_xticks(angles[:-1])
+        ax.set_xticks(angles)
         ax.set_xticklabels(dimensions)
         ax.set_ylim(0, 1)
         ax.set_yticks([0.2, 0.4, 0.6, 0.8, 1.0])
@@ -204,69 +231,71 @@ def create_risk_radar_chart(risk_summary: Dict) -> Optional[plt.Figure]:
         
         ax.set_title('Contract Risk Profile', size=16, fontweight='bold', pad=30)
         
-        plt.tight_layout()
-        return fig
+        fig.subplots_adjust(left=0.1, right=0.9, top=0.85, bottom=0.1)
+        return _figure_to_png(fig)
         
     except Exception as e:
         print(f"Error creating radar chart: {e}")
         return None
 
-def create_clause_risk_timeline(clauses: List[Dict], clause_risks: List[Dict]) -> Optional[plt.Figure]:
+@_cache_chart
+def create_clause_risk_timeline(clauses: List[Dict], clause_risks: List[Dict]) -> Optional[alt.LayerChart]:
     """
-    Create a timeline showing risk scores across clauses.
+    Create an interactive timeline showing risk scores across clauses.
+    
+    The chart is a Vega-Lite spec rendered by the browser, so panning and
+    zooming happen client-side without Streamlit reruns. Display it with
+    ``st.altair_chart``.
     
     Args:
         clauses: List of clause dictionaries  
         clause_risks: List of risk assessment dictionaries
         
     Returns:
-        Matplotlib figure object or None if insufficient data
+        Altair chart or None if insufficient data
     """
     try:
         if not clauses or not clause_risks:
             return None
             
-        # Create risk lookup
-        risk_lookup = {risk["clause_id"]: risk for risk in clause_risks}
-        
         # Prepare data
-        clause_ids = [clause["id"] for clause in clauses]
-        risk_scores = [risk_lookup.get(clause["id"], {}).get("risk_score", 0) for clause in clauses]
-        risk_levels = [risk_lookup.get(clause["id"], {}).get("risk_level", "Unknown") for clause in clauses]
-        
-        # Create figure
-        fig, ax = plt.subplots(figsize=(12, 6))
+        data = _clause_risk_frame(clauses, clause_risks).rename(columns={"id": "clause_id"})
+        data = data[["clause_id", "risk_score", "risk_level"]]
         
         # Color map for risk levels
         color_map = {'Low': '#4CAF50', 'Medium': '#FF9800', 'High': '#F44336', 'Unknown': '#9E9E9E'}
-        colors = [color_map.get(level, '#9E9E9E') for level in risk_levels]
+        color = alt.Color(
+            "risk_level:N",
+            title="Risk Level",
+            scale=alt.Scale(domain=list(color_map), range=list(color_map.values())),
+        )
+        x = alt.X("clause_id:Q", title="Clause ID")
+        y = alt.Y("risk_score:Q", title="Risk Score")
         
         # Plot timeline
-        ax.scatter(clause_ids, risk_scores, c=colors, s=100, alpha=0.7)
-        ax.plot(clause_ids, risk_scores, color='gray', alpha=0.5, linestyle='--')
+        base = alt.Chart(data)
+        line = base.mark_line(color='gray', opacity=0.5, strokeDash=[4, 4]).encode(x=x, y=y)
+        points = base.mark_circle(size=100, opacity=0.7).encode(
+            x=x, y=y, color=color,
+            tooltip=["clause_id", "risk_level", alt.Tooltip("risk_score:Q", format=".3f")],
+        )
         
         # Add risk level thresholds
-        ax.axhline(y=0.25, color='green', linestyle='-', alpha=0.3, label='Low Risk Threshold')
-        ax.axhline(y=0.55, color='orange', linestyle='-', alpha=0.3, label='High Risk Threshold')
-        
-        ax.set_xlabel('Clause ID')
-        ax.set_ylabel('Risk Score')
-        ax.set_title('Risk Score Timeline Across Clauses', fontsize=14, fontweight='bold')
-        ax.legend()
-        ax.grid(True, alpha=0.3)
+        thresholds = alt.Chart(pd.DataFrame({
+            "threshold": [0.25, 0.55],
+            "color": ['green', 'orange'],
+        })).mark_rule(opacity=0.3).encode(y="threshold:Q", color=alt.Color("color:N", scale=None))
         
         # Annotate high-risk clauses
-        for i, (clause_id, score, level) in enumerate(zip(clause_ids, risk_scores, risk_levels)):
-            if level == 'High':
-                ax.annotate(f'Clause {clause_id}', 
-                           (clause_id, score), 
-                           xytext=(5, 5), 
-                           textcoords='offset points',
-                           fontsize=8, 
-                           fontweight='bold')
-        
-        plt.tight_layout()
-        return fig
+        labels = base.transform_filter(alt.datum.risk_level == 'High').mark_text(
+            align='left', dx=5, dy=-5, fontSize=8, fontWeight='bold'
+        ).encode(x=x, y=y, text=alt.Text("clause_id:Q", format="d"))
+        
+        return (
+            alt.layer(thresholds, line, points, labels)
+            .properties(title='Risk Score Timeline Across Clauses', height=360)
+            .interactive()
+        )
         
     except Exception as e:
         print(f"Error creating timeline chart: {e}")
@@ -274,7 +303,6 @@ def create_clause_risk_timeline(clauses: List[Dict], clause_risks: List[Dict]) -
 
 if __name__ == "__main__":
     # Demo functionality
-    import matplotlib.pyplot as plt
     
     # Sample data
     sample_risk_summary = {
@@ -303,19 +331,22 @@ if __name__ == "__main__":
     # Test risk distribution chart
     fig1 = create_risk_chart(sample_risk_summary)
     if fig1:
-        plt.show()
+        with open("risk_distribution.png", "wb") as f:
+            f.write(fig1)
         print("✓ Risk distribution chart created")
     
     # Test risk heatmap
     fig2 = create_risk_score_heatmap(sample_clauses, sample_risks)
     if fig2:
-        plt.show()
+        with open("risk_heatmap.png", "wb") as f:
+            f.write(fig2)
         print("✓ Risk heatmap created")
     
     # Test radar chart
     fig3 = create_risk_radar_chart(sample_risk_summary)
     if fig3:
-        plt.show()
+        with open("risk_radar.png", "wb") as f:
+            f.write(fig3)
         print("✓ Risk radar chart created")
     
     print("Demo completed!")
@@ -3,8 +3,68 @@
 Summary card component for displaying contract summaries and key insights.
 """
 
+import html
+import ahocorasick
 import streamlit as st
-from typing import Dict, List, Optional
+from collections import defaultdict
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+_fragment = getattr(st, "fragment", None) or getattr(st, "experimental_fragment", None) or (lambda f: f)
+
+# Marker shown next to the contract risk level
+_RISK_COLOR = {
+    "Low": "🟢",
+    "Medium": "🟡",
+    "High": "🔴"
+}
+
+# Simple replacements for legal jargon; where terms overlap, the longest
+# leftmost match wins (see _simplify_summary), not table order
+_SIMPLIFICATIONS = {
+    "hereby": "by this document",
+    "whereas": "since",
+    "shall": "will",
+    "pursuant to": "according to",
+    "notwithstanding": "despite",
+    "indemnify": "protect from legal costs",
+    "liquidated damages": "agreed penalty amount",
+    "force majeure": "uncontrollable events",
+    "termination": "ending the contract",
+    "confidential": "private/secret",
+    "intellectual property": "creative works and ideas",
+    "liability": "legal responsibility"
+}
+
+def _build_simplify_automaton() -> ahocorasick.Automaton:
+    """One automaton over every jargon term, each mapping to (length, replacement)."""
+    automaton = ahocorasick.Automaton()
+    for term, simple_term in _SIMPLIFICATIONS.items():
+        automaton.add_word(term, (len(term), simple_term))
+    automaton.make_automaton()
+    return automaton
+
+# Scans for every term at once, however long the jargon table grows
+_SIMPLIFY_AUTOMATON = _build_simplify_automaton()
+
+def _metrics_html(metrics: List[Tuple[str, object, Optional[str]]], direction: str = "row") -> str:
+    """
+    Read-only (label, value, delta) metrics as one HTML flex block styled
+    after st.metric, so a group of metrics is a single markdown element.
+    """
+    items = []
+    for label, value, delta in metrics:
+        delta_html = (
+            f'<div style="font-size:0.85rem;opacity:0.7">{html.escape(str(delta))}</div>'
+            if delta is not None else ""
+        )
+        items.append(
+            '<div style="flex:1;min-width:0">'
+            f'<div style="font-size:0.875rem;opacity:0.8">{html.escape(str(label))}</div>'
+            f'<div style="font-size:1.75rem;line-height:1.4">{html.escape(str(value))}</div>'
+            f"{delta_html}</div>"
+        )
+    return f'<div style="display:flex;flex-direction:{direction};gap:1rem">{"".join(items)}</div>'
 
 def render_summary_card(summaries: Dict, risk_summary: Dict) -> None:
     """
@@ -36,27 +96,17 @@ def render_summary_card(summaries: Dict, risk_summary: Dict) -> None:
             st.markdown("**Key Metrics**")
             
             risk_level = risk_summary.get("contract_risk_level", "Unknown")
-            risk_color = {
-                "Low": "🟢",
-                "Medium": "🟡", 
-                "High": "🔴"
-            }.get(risk_level, "⚪")
-            
-            st.metric(
-                "Risk Level",
-                f"{risk_color} {risk_level}",
-                delta=f"Score: {risk_summary.get('contract_risk_score', 0):.3f}"
-            )
-            
-            st.metric(
-                "Total Clauses",
-                risk_summary.get('total_clauses', 0)
-            )
+            risk_color = _RISK_COLOR.get(risk_level, "⚪")
             
-            st.metric(
-                "High Risk Items",
-                risk_summary.get('high_risk_count', 0),
-                delta="Critical" if risk_summary.get('high_risk_count', 0) > 0 else "Good"
+            high_risk_count = risk_summary.get('high_risk_count', 0)
+            st.markdown(
+                _metrics_html([
+                    ("Risk Level", f"{risk_color} {risk_level}",
+                     f"Score: {risk_summary.get('contract_risk_score', 0):.3f}"),
+                    ("Total Clauses", risk_summary.get('total_clauses', 0), None),
+                    ("High Risk Items", high_risk_count, "Critical" if high_risk_count > 0 else "Good")
+                ], direction="column"),
+                unsafe_allow_html=True
             )
 
 def render_risk_insights_card(risk_summary: Dict, top_entities: List[Dict] = None) -> None:
@@ -69,52 +119,49 @@ def render_risk_insights_card(risk_summary: Dict, top_entities: List[Dict] = Non
     """
     st.markdown("#### ⚠️ Risk Insights")
     
-    # Risk distribution
-    col1, col2, col3 = st.columns(3)
-    
-    with col1:
-        st.metric(
-            "🔴 High Risk",
-            risk_summary.get('high_risk_count', 0),
-            delta=f"{risk_summary.get('high_risk_count', 0)/risk_summary.get('total_clauses', 1)*100:.1f}%"
-        )
-    
-    with col2:
-        st.metric(
-            "🟡 Medium Risk", 
-            risk_summary.get('medium_risk_count', 0),
-            delta=f"{risk_summary.get('medium_risk_count', 0)/risk_summary.get('total_clauses', 1)*100:.1f}%"
-        )
-    
-    with col3:
-        st.metric(
-            "🟢 Low Risk",
-            risk_summary.get('low_risk_count', 0),
-            delta=f"{risk_summary.get('low_risk_count', 0)/risk_summary.get('total_clauses', 1)*100:.1f}%"
-        )
+    # Counts and share of all clauses (an explicit 0 total counts as 1)
+    high_count = risk_summary.get('high_risk_count', 0)
+    medium_count = risk_summary.get('medium_risk_count', 0)
+    low_count = risk_summary.get('low_risk_count', 0)
+    percent_per_clause = 100.0 / (risk_summary.get('total_clauses', 1) or 1)
+    
+    # Risk distribution, three metrics side by side in one element
+    st.markdown(
+        _metrics_html([
+            ("🔴 High Risk", high_count, f"{high_count * percent_per_clause:.1f}%"),
+            ("🟡 Medium Risk", medium_count, f"{medium_count * percent_per_clause:.1f}%"),
+            ("🟢 Low Risk", low_count, f"{low_count * percent_per_clause:.1f}%")
+        ]),
+        unsafe_allow_html=True
+    )
     
     # Top risk factors
     top_risky_clauses = risk_summary.get('top_risky_clauses', [])
     if top_risky_clauses:
         st.markdown("**⚡ Top Risk Factors:**")
         
+        # Collected and sent as one markdown element
+        factor_lines = []
         for i, clause_risk in enumerate(top_risky_clauses[:3], 1):
             matched_terms = clause_risk.get('matched_terms', [])
-            if matched_terms:
-                terms_text = ", ".join(matched_terms[:3])
-                if len(matched_terms) > 3:
-                    terms_text += f" +{len(matched_terms)-3} more"
-                
-                st.markdown(
-                    f"**{i}.** Clause {clause_risk['clause_id']}: "
-                    f"*{terms_text}* (Score: {clause_risk['risk_score']:.3f})"
-                )
+            if not matched_terms:
+                continue
+            extra_terms = len(matched_terms) - 3
+            more_text = f" +{extra_terms} more" if extra_terms > 0 else ""
+            
+            factor_lines.append(
+                f"**{i}.** Clause {clause_risk['clause_id']}: "
+                f"*{', '.join(matched_terms[:3])}{more_text}* (Score: {clause_risk['risk_score']:.3f})"
+            )
+        if factor_lines:
+            st.markdown("\n\n".join(factor_lines))
     
     # Key entities (if provided)
     if top_entities:
         st.markdown("**🏢 Key Parties & Entities:**")
-        for entity in top_entities[:5]:
-            st.markdown(f"- **{entity['text']}** ({entity['label']})")
+        st.markdown("\n".join(
+            f"- **{entity['text']}** ({entity['label']})" for entity in top_entities[:5]
+        ))
 
 def render_clause_summary_cards(per_clause_summaries: List[Dict]) -> None:
     """
@@ -129,21 +176,23 @@ def render_clause_summary_cards(per_clause_summaries: List[Dict]) -> None:
     
     st.markdown("#### 📝 Clause Summaries")
     
-    # Group by clause type
-    type_groups = {}
-    for clause_summary in per_clause_summaries:
-        clause_type = clause_summary.get("clause_type", "Unknown")
-        if clause_type not in type_groups:
-            type_groups[clause_type] = []
-        type_groups[clause_type].append(clause_summary)
-    
-    # Display by type
-    for clause_type, clauses in type_groups.items():
+    # Display by type, each group's summaries as a single markdown element
+    # (elements per type, not three per clause)
+    for clause_type, clauses in _group_clause_summaries(per_clause_summaries).items():
         with st.expander(f"📄 **{clause_type} Clauses** ({len(clauses)})"):
-            for clause_summary in clauses:
-                st.markdown(f"**Clause {clause_summary.get('clause_id')}:**")
-                st.write(clause_summary.get('summary', 'No summary available'))
-                st.markdown("---")
+            st.markdown("\n\n".join(
+                f"**Clause {clause_summary.get('clause_id')}:**\n\n"
+                f"{clause_summary.get('summary', 'No summary available')}\n\n---"
+                for clause_summary in clauses
+            ))
+
+@st.cache_data(max_entries=32, show_spinner=False)
+def _group_clause_summaries(per_clause_summaries: List[Dict]) -> Dict[str, List[Dict]]:
+    """Clause summaries grouped by clause type, in first-appearance order."""
+    type_groups = defaultdict(list)
+    for clause_summary in per_clause_summaries:
+        type_groups[clause_summary.get("clause_type", "Unknown")].append(clause_summary)
+    return dict(type_groups)
 
 def render_explain_like_im_20_toggle(summaries: Dict) -> None:
     """
@@ -154,6 +203,14 @@ def render_explain_like_im_20_toggle(summaries: Dict) -> None:
     """
     st.markdown("#### 🎓 Simplified Explanation")
     
+    _render_eli20_body(summaries)
+
+@_fragment
+def _render_eli20_body(summaries: Dict) -> None:
+    """
+    The toggle and what it shows. A fragment: flipping the toggle reruns
+    only this block, not the cards around it.
+    """
     if st.toggle("Explain Like I'm 20", key="eli20_toggle"):
         # Generate simplified explanation
         simplified_summary = _simplify_summary(summaries.get("short_summary", ""))
@@ -164,14 +221,15 @@ def render_explain_like_im_20_toggle(summaries: Dict) -> None:
         # Key takeaways
         st.markdown("**Key Takeaways:**")
         takeaways = _generate_key_takeaways(summaries)
-        for i, takeaway in enumerate(takeaways, 1):
-            st.markdown(f"{i}. {takeaway}")
+        st.markdown("\n".join(f"{i}. {takeaway}" for i, takeaway in enumerate(takeaways, 1)))
     else:
         st.markdown("*Toggle above to see a simplified explanation of the contract*")
 
+@lru_cache(maxsize=256)
 def _simplify_summary(summary: str) -> str:
     """
-    Convert technical summary to simplified language.
+    Convert technical summary to simplified language. Memoized: the toggle
+    re-renders the same summary on every rerun.
     
     Args:
         summary: Original summary text
@@ -182,25 +240,22 @@ def _simplify_summary(summary: str) -> str:
     if not summary:
         return "This contract sets up a business agreement between different parties."
     
-    # Simple replacements for legal jargon
-    simplifications = {
-        "hereby": "by this document",
-        "whereas": "since",
-        "shall": "will",
-        "pursuant to": "according to",
-        "notwithstanding": "despite",
-        "indemnify": "protect from legal costs",
-        "liquidated damages": "agreed penalty amount",
-        "force majeure": "uncontrollable events",
-        "termination": "ending the contract",
-        "confidential": "private/secret",
-        "intellectual property": "creative works and ideas",
-        "liability": "legal responsibility"
-    }
-    
-    simplified = summary.lower()
-    for complex_term, simple_term in simplifications.items():
-        simplified = simplified.replace(complex_term.lower(), simple_term)
+    # Every term found in a single pass over the lowercased text (longest
+    # non-overlapping matches) and spliced between the gaps of the original,
+    # so names and other text outside the jargon keep their casing. Should
+    # lowercasing change the length (some non-ASCII letters), offsets no
+    # longer line up and the lowercased text is used throughout.
+    lowered = summary.lower()
+    text = summary if len(lowered) == len(summary) else lowered
+    segments = []
+    position = 0
+    for end, (length, simple_term) in _SIMPLIFY_AUTOMATON.iter_long(lowered):
+        start = end - length + 1
+        segments.append(text[position:start])
+        segments.append(simple_term)
+        position = end + 1
+    segments.append(text[position:])
+    simplified = "".join(segments)
     
     # Capitalize first letter
     simplified = simplified[0].upper() + simplified[1:] if simplified else ""
@@ -239,12 +294,23 @@ def render_action_items_card(risk_summary: Dict) -> None:
     """
     st.markdown("#### ✅ Recommended Actions")
     
+    actions = _compute_action_items(
+        risk_summary.get('contract_risk_level', 'Unknown'),
+        risk_summary.get('high_risk_count', 0)
+    )
+    
+    # One markdown element, one paragraph per action
+    st.markdown("\n\n".join(actions))
+
+@lru_cache(maxsize=64)
+def _compute_action_items(risk_level: str, high_risk_count: int) -> Tuple[str, ...]:
+    """
+    Top six recommended actions for a contract risk level and high-risk
+    clause count. Depends only on those two values, so it is memoized.
+    """
     actions = []
     
     # Generate actions based on risk level
-    risk_level = risk_summary.get('contract_risk_level', 'Unknown')
-    high_risk_count = risk_summary.get('high_risk_count', 0)
-    
     if risk_level == "High" or high_risk_count > 2:
         actions.append("🔴 **URGENT**: Have this contract reviewed by a qualified attorney")
         actions.append("📋 Negotiate terms for high-risk clauses before signing")
@@ -261,8 +327,7 @@ def render_action_items_card(risk_summary: Dict) -> None:
         "💾 Keep digital and physical copies of the signed contract"
     ])
     
-    for action in actions[:6]:  # Show top 6 actions
-        st.markdown(action)
+    return tuple(actions[:6])  # Top 6 actions
 
 if __name__ == "__main__":
     # Demo functionality
@@ -1,14 +1,32 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
 import pdfplumber
 
 path = r"C:\Users\smach\OneDrive\Desktop\sample_contract.pdf"
 
-with pdfplumber.open(path) as pdf:
-    full_text = ""
-    for page in pdf.pages:
-        page_text = page.extract_text()
-        print(f"Page text: {repr(page_text)}")  # Check if None or empty
-        if page_text:
-            full_text += page_text + "\n\n"
 
-print("Full text length:", len(full_text))
-print(full_text[:1000])  # Print first 1000 chars
+def extract_page_range(path, start, stop):
+    # Worker: open the PDF once and extract pages [start, stop)
+    with pdfplumber.open(path) as pdf:
+        return [pdf.pages[i].extract_text() for i in range(start, stop)]
+
+
+if __name__ == "__main__":
+    with pdfplumber.open(path) as pdf:
+        num_pages = len(pdf.pages)
+
+    # One contiguous page range per worker, results kept in page order
+    step = -(-num_pages // (os.cpu_count() or 1)) or 1
+    ranges = [(start, min(start + step, num_pages)) for start in range(0, num_pages, step)]
+    with ProcessPoolExecutor(max_workers=max(len(ranges), 1)) as executor:
+        futures = [executor.submit(extract_page_range, path, start, stop) for start, stop in ranges]
+        page_texts = [text for future in futures for text in future.result()]
+
+    parts = [text for text in page_texts if text]
+    empty_pages = len(page_texts) - len(parts)  # None or empty
+    full_text = "\n\n".join(parts)
+
+    print("Pages without text:", empty_pages)
+    print("Full text length:", len(full_text))
+    print(full_text[:1000])  # Print first 1000 chars